@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',  # <<<<<內建
+    'django.contrib.postgres',  # 全文搜尋 (SearchVector / GIN 索引)
     'user',  # 使用者API
     'core',
     'rest_framework',
@@ -62,6 +63,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -102,6 +104,11 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': '5432',
+        # 持久連線：每個 uWSGI worker 重複使用同一條連線 (秒數，0 = 每個請求重新連線)
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # 重複使用連線前先確認連線仍可用，避免資料庫重啟後的第一個請求失敗
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))),
     }
 }
 
@@ -112,6 +119,52 @@ DATABASES = {
 #     }
 # }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# redis://host:6379/0 需要安裝 redis 套件；memcached://host:11211 需要 pymemcache
+# 快取必須由所有 process 共用 (app、圖片 worker、多個 uWSGI worker)：
+# 各自的 local memory 無法同步失效，某個 process 寫入後，其他 process 仍回傳
+# 舊的快取；docker-compose 的開發環境也設定了 CACHE_URL (redis)
+# CACHE_URL 未設定時：
+# - 測試 / 單獨執行 runserver (DEBUG，沒有其他 process) 使用 local memory
+# - 正式環境改用 DummyCache 不快取
+
+CACHE_URL = os.environ.get('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith('memcached://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': CACHE_URL.removeprefix('memcached://'),
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    }
+
+# 食譜 / 標籤 / 食材回應快取 (recipe/cache.py)
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
+# Token 驗證快取 (user/authentication.py)，TTL 短以限制停用帳號等變更的延遲
+TOKEN_AUTH_CACHE_ALIAS = 'default'
+TOKEN_AUTH_CACHE_TIMEOUT = int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -152,6 +205,19 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# 正式環境：collectstatic 產生含內容雜湊的檔名與 .gz 壓縮檔 (core/storage.py)
+# 由 nginx 直接送出並長期快取；開發時 (DEBUG) 不需先執行 collectstatic
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage'
+            if DEBUG else 'core.storage.CompressedManifestStaticFilesStorage'),
+    },
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -164,6 +230,17 @@ AUTH_USER_MODEL = 'core.User'  # get_user_model 對應的model url位置 哪個a
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 
+    # JSON 以 orjson 編碼 / 解析 (未安裝時與 DRF 預設相同，見 core/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
 
     # 默認驗證類是[]
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -182,9 +259,39 @@ REST_FRAMEWORK = {
 
 }
 
+# 全文搜尋使用的 Postgres text search config (simple 不做英文詞幹處理，適用各種語言)
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'simple')
+
+# 標籤 / 食材自動完成：每個 process 保留的最近查詢結果數 (recipe/autocomplete.py)
+AUTOCOMPLETE_LRU_SIZE = int(os.environ.get('AUTOCOMPLETE_LRU_SIZE', 2048))
+
+# 標籤 / 食材列表的 recipe_count：0 為查詢時以子查詢計數，
+# 1 改讀維護中的 recipe_count 欄位 (標籤很多的帳號，見 recipe/counts.py)
+RECIPE_ATTR_COUNTER_COLUMN = bool(
+    int(os.environ.get('RECIPE_ATTR_COUNTER_COLUMN', 0)))
+
+# 回應壓縮 (core/middleware.py)：小於 MIN_SIZE bytes 的回應不壓縮；
+# 等級的 CPU 成本與壓縮率可用 manage.py bench_compression 比較
+RESPONSE_COMPRESSION_MIN_SIZE = int(
+    os.environ.get('RESPONSE_COMPRESSION_MIN_SIZE', 1024))
+RESPONSE_COMPRESSION_GZIP_LEVEL = int(
+    os.environ.get('RESPONSE_COMPRESSION_GZIP_LEVEL', 6))
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(
+    os.environ.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', 4))
+
+# 背景圖片處理 (recipe/tasks.py)：取出超過這麼多秒仍未完成的工作視為中斷，放回佇列
+IMAGE_PROCESSING_TIMEOUT = int(os.environ.get('IMAGE_PROCESSING_TIMEOUT', 300))
+
+# 列表分頁預設每頁筆數 (客戶端可用 page_size 調整，上限見 recipe/pagination.py)
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 20))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
 }
+
+# JWT 撤銷清單 (user/revocation.py)，各 process 每隔幾秒從資料庫同步一次
+JWT_REVOCATION_REFRESH_SECONDS = int(
+    os.environ.get('JWT_REVOCATION_REFRESH_SECONDS', 5))
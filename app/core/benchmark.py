@@ -0,0 +1,147 @@
+"""
+效能測試用的共用工具 (給 bench_* management commands 使用)
+- seed_dataset: 建立大量使用者 / 食譜 / 標籤 / 食材
+- timed: 重複執行並回傳中位數耗時
+- rollback: 在 transaction 內執行，結束後全部還原，不留下測試資料
+- view_queryset: 與 API 相同的查詢 (viewset 的 get_queryset)
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.counts import refresh_recipe_counts
+from recipe.summaries import refresh_summaries
+
+BATCH_SIZE = 2000
+
+
+class _Rollback(Exception):
+    """用來離開 transaction.atomic 並還原所有寫入"""
+
+
+@contextmanager
+def rollback():
+    """區塊內的所有資料庫變更 (含 DDL) 在結束後還原"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def view_queryset(viewset, user, params=None, action='list'):
+    """
+    viewset 處理 GET (含查詢參數) 時 get_queryset() 回傳的 queryset，
+    量測的查詢隨 view 的過濾 / 排序 / 欄位規劃一起變更
+    """
+    request = Request(APIRequestFactory().get('/', params or {}))
+    request.user = user
+    view = viewset(request=request, action=action, format_kwarg=None,
+                   args=(), kwargs={})
+    return view.get_queryset()
+
+
+def seed_dataset(users=5, recipes_per_user=1000, tags_per_user=50,
+                 ingredients_per_user=200, tags_per_recipe=3,
+                 ingredients_per_recipe=8, seed=0):
+    """
+    建立測試資料並更新統計資訊 (ANALYZE)，讓查詢計畫反映真實資料量
+    result: 建立的使用者 list
+    """
+    rng = random.Random(seed)
+    user_model = get_user_model()
+    created_users = user_model.objects.bulk_create([
+        user_model(email=f'bench{seed}-{i}@example.com', name=f'Bench {i}')
+        for i in range(users)
+    ])
+
+    tags = Tag.objects.bulk_create([
+        Tag(user=user, name=f'Tag {i}')
+        for user in created_users for i in range(tags_per_user)
+    ], batch_size=BATCH_SIZE)
+    ingredients = Ingredient.objects.bulk_create([
+        Ingredient(user=user, name=f'Ingredient {i}')
+        for user in created_users for i in range(ingredients_per_user)
+    ], batch_size=BATCH_SIZE)
+    recipes = Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+            description=' '.join(rng.choices(WORDS, k=12)),
+            time_minutes=rng.randint(5, 180),
+            price=Decimal(rng.randint(100, 9999)) / 100,
+        )
+        # 各使用者的食譜交錯建立，與實際多使用者寫入的分布相同
+        for i in range(recipes_per_user) for user in created_users
+    ], batch_size=BATCH_SIZE)
+
+    tags_by_user = _group_by_user(tags)
+    ingredients_by_user = _group_by_user(ingredients)
+    tag_rows = []
+    ingredient_rows = []
+    for recipe in recipes:
+        for tag in rng.sample(tags_by_user[recipe.user_id], tags_per_recipe):
+            tag_rows.append(
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id))
+        for ingredient in rng.sample(
+                ingredients_by_user[recipe.user_id], ingredients_per_recipe):
+            ingredient_rows.append(Recipe.ingredients.through(
+                recipe_id=recipe.id, ingredient_id=ingredient.id))
+    Recipe.tags.through.objects.bulk_create(tag_rows, batch_size=BATCH_SIZE)
+    Recipe.ingredients.through.objects.bulk_create(
+        ingredient_rows, batch_size=BATCH_SIZE)
+
+    # 關聯以 bulk_create 寫入不觸發 signal，自行建立反正規化的欄位
+    refresh_summaries(
+        Recipe.objects.filter(user__in=created_users).values('id'))
+    for model, objs in ((Tag, tags), (Ingredient, ingredients)):
+        refresh_recipe_counts(model, [obj.id for obj in objs])
+
+    analyze()
+    return created_users
+
+
+def analyze():
+    """更新食譜相關資料表的統計資訊"""
+    tables = [model._meta.db_table for model in (Recipe, Tag, Ingredient)]
+    tables += [
+        Recipe.tags.through._meta.db_table,
+        Recipe.ingredients.through._meta.db_table,
+    ]
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+
+
+def timed(func, repeat=20):
+    """重複執行 func，回傳耗時中位數 (ms)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _group_by_user(objs):
+    grouped = {}
+    for obj in objs:
+        grouped.setdefault(obj.user_id, []).append(obj)
+    return grouped
+
+
+WORDS = [
+    'chicken', 'beef', 'tofu', 'garlic', 'ginger', 'lemon', 'curry',
+    'noodle', 'rice', 'soup', 'salad', 'roast', 'spicy', 'sweet', 'sour',
+    'grilled', 'braised', 'tomato', 'basil', 'mushroom', 'pepper', 'onion',
+    'pork', 'shrimp', 'egg', 'cheese', 'bread', 'pasta', 'bean', 'corn',
+]
@@ -0,0 +1,51 @@
+"""
+Django command to benchmark tag / ingredient autocomplete.
+建立食材數量多的使用者後，量測開頭比對 + pg_trgm 查詢 (未命中 LRU) 與命中 LRU 的耗時，
+看出 trigram 索引的查詢成本與每個 process 的 LRU 省下多少
+"""
+from django.core.management.base import BaseCommand
+
+from core.benchmark import rollback, seed_dataset, timed
+from core.models import Ingredient
+from recipe.autocomplete import autocomplete, clear_cache, trigram_available
+
+
+class Command(BaseCommand):
+    """Measure autocomplete latency for users with many ingredients."""
+
+    help = 'Benchmark the tag / ingredient autocomplete action.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--ingredients', type=int, default=5000,
+                            help='Ingredients per user.')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with rollback():
+            users = seed_dataset(
+                users=options['users'],
+                recipes_per_user=10,
+                ingredients_per_user=options['ingredients'],
+            )
+            user_id = users[0].pk
+            self.stdout.write(
+                f'pg_trgm installed: {trigram_available()}')
+
+            for text in ('Ingredient 42', 'ingredeint 4', 'zzz'):
+                queryset = Ingredient.objects.filter(
+                    user_id=user_id, name__istartswith=text)[:10]
+                self.stdout.write(self.style.MIGRATE_LABEL(repr(text)))
+                self.stdout.write(queryset.explain(analyze=True))
+
+                def uncached(text=text):
+                    clear_cache()
+                    autocomplete(Ingredient, user_id, text, 10)
+
+                def cached(text=text):
+                    autocomplete(Ingredient, user_id, text, 10)
+
+                self.stdout.write(
+                    f'  database {timed(uncached, repeat):8.3f} ms  '
+                    f'LRU hit {timed(cached, repeat):8.3f} ms')
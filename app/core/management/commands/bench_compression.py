@@ -0,0 +1,71 @@
+"""
+Django command to benchmark response compression on recipe payloads.
+以食譜列表的 JSON 輸出 (20 / 100 / 1000 筆) 比較各壓縮等級的
+CPU 時間與壓縮後大小，用來調整 RESPONSE_COMPRESSION_* 設定
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.benchmark import rollback, seed_dataset, timed
+from core.middleware import BrotliCodec, GzipCodec, brotli
+from core.models import Recipe
+from core.renderers import FastJSONRenderer
+from recipe.queries import plan_recipe_queryset
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Compare gzip levels and brotli qualities on recipe list payloads."""
+
+    help = 'Benchmark CPU cost versus bytes saved by response compression.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,100,1000',
+                            help='Comma-separated list sizes.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        repeat = options['repeat']
+
+        with rollback():
+            user, = seed_dataset(users=1, recipes_per_user=max(sizes))
+            serializer = RecipeSerializer()
+            recipes = plan_recipe_queryset(
+                Recipe.objects.filter(user=user).order_by('-id'), serializer)
+            bodies = {
+                size: FastJSONRenderer().render(
+                    RecipeSerializer(recipes[:size], many=True).data)
+                for size in sizes
+            }
+
+        codecs = [(level, GzipCodec(level)) for level in (1, 6, 9)]
+        if brotli is None:
+            self.stdout.write('brotli is not installed, skipping br.')
+        else:
+            codecs += [(quality, BrotliCodec(quality))
+                       for quality in (1, 4, 6, 11)]
+        configured = {
+            ('gzip', settings.RESPONSE_COMPRESSION_GZIP_LEVEL),
+            ('br', settings.RESPONSE_COMPRESSION_BROTLI_QUALITY),
+        }
+
+        self.stdout.write(self.style.SUCCESS(
+            'Median ms per response (* = configured):'))
+        self.stdout.write(
+            f'  {"recipes":>8} {"codec":>9} {"bytes":>9} {"saved":>7} '
+            f'{"ms":>8} {"MB/s":>8}')
+        for size, body in bodies.items():
+            self.stdout.write(
+                f'  {size:>8} {"identity":>9} {len(body):>9} {"":>7} '
+                f'{"":>8} {"":>8}')
+            for level, codec in codecs:
+                compressed = codec.compress(body)
+                ms = timed(lambda: codec.compress(body), repeat)
+                saved = 1 - len(compressed) / len(body)
+                speed = len(body) / 1e6 / (ms / 1000) if ms else 0
+                marker = '*' if (codec.name, level) in configured else ' '
+                label = f'{codec.name}-{level}{marker}'
+                self.stdout.write(
+                    f'  {size:>8} {label:>9} {len(compressed):>9} '
+                    f'{saved:>7.1%} {ms:>8.3f} {speed:>8.1f}')
@@ -0,0 +1,68 @@
+"""
+Django command to measure per-request database connection overhead.
+模擬 uWSGI worker 處理請求的生命週期 (request_started -> 查詢 -> request_finished)，
+比較每個請求重新連線、持久連線、持久連線 + health check 的延遲
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+MODES = [
+    ('new connection per request', {'CONN_MAX_AGE': 0}),
+    ('persistent', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False}),
+    ('persistent + health checks',
+     {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}),
+]
+
+
+class Command(BaseCommand):
+    """Compare request latency with and without persistent connections."""
+
+    help = 'Measure per-request DB connection overhead.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--queries', type=int, default=3,
+                            help='Queries per simulated request.')
+
+    def handle(self, *args, **options):
+        original = {
+            key: connection.settings_dict.get(key)
+            for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')
+        }
+
+        self.stdout.write(
+            f'{options["requests"]} requests x {options["queries"]} queries '
+            f'({connection.vendor} @ {connection.settings_dict["HOST"]})')
+        baseline = None
+        try:
+            for label, overrides in MODES:
+                connection.close()
+                connection.settings_dict.update(overrides)
+                samples = self._run(options['requests'], options['queries'])
+                median = statistics.median(samples)
+                p95 = statistics.quantiles(samples, n=20)[-1]
+                baseline = baseline or median
+                self.stdout.write(
+                    f'  {label:<28} median {median:7.3f} ms  '
+                    f'p95 {p95:7.3f} ms  '
+                    f'saved {baseline - median:7.3f} ms/request')
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+
+    def _run(self, requests, queries):
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
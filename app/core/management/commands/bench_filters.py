@@ -0,0 +1,61 @@
+"""
+Django command to benchmark tag / ingredient filtering of the recipe list.
+?tags= 的兩種寫法各自的耗時：
+any 為 JOIN + DISTINCT 與 EXISTS 子查詢；all 為每個標籤各 JOIN 一次與分組計數
+"""
+from django.core.management.base import BaseCommand
+
+from core.benchmark import rollback, seed_dataset, timed
+from core.models import Recipe, Tag
+from recipe.queries import MATCH_ALL, filter_by_related
+
+
+class Command(BaseCommand):
+    """Compare join-based and subquery-based recipe filters."""
+
+    help = 'Benchmark ?tags= filtering with match=any / match=all.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--recipes', type=int, default=20000,
+                            help='Recipes per user.')
+        parser.add_argument('--tags', type=int, default=5,
+                            help='Number of tags in the filter.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rollback():
+            users = seed_dataset(
+                users=options['users'],
+                recipes_per_user=options['recipes'],
+                tags_per_user=50,
+                tags_per_recipe=5,
+            )
+            recipes = Recipe.objects.filter(user=users[0]).order_by('-id')
+            tag_ids = list(
+                Tag.objects.filter(user=users[0])
+                .values_list('id', flat=True)[:options['tags']])
+
+            chained = recipes
+            for tag_id in tag_ids:
+                chained = chained.filter(tags__id=tag_id)
+
+            cases = {
+                'any: join + distinct': recipes.filter(
+                    tags__id__in=tag_ids).distinct(),
+                'any: exists': filter_by_related(recipes, 'tags', tag_ids),
+                'all: join per tag': chained,
+                'all: grouped count': filter_by_related(
+                    recipes, 'tags', tag_ids, MATCH_ALL),
+            }
+            results = {}
+            for name, queryset in cases.items():
+                page = queryset[:20]
+                self.stdout.write(self.style.MIGRATE_LABEL(name))
+                self.stdout.write(page.explain(analyze=True))
+                results[name] = timed(
+                    lambda: list(page.all()), options['repeat'])
+
+        self.stdout.write(self.style.SUCCESS('Summary (median ms):'))
+        for name, ms in results.items():
+            self.stdout.write(f'  {name:<24} {ms:8.2f}')
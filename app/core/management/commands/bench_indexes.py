@@ -0,0 +1,91 @@
+"""
+Django command to show query plans for the per-user list hot paths.
+以 view 實際的 get_queryset() 產生食譜 / 標籤 / 食材列表的查詢，分別在
+「有索引」與「拿掉 0009 的索引/唯一限制」兩種狀態下印出 EXPLAIN ANALYZE 與
+中位數耗時，確認列表的第一頁走索引而不是掃描整個資料表後排序
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.benchmark import rollback, seed_dataset, timed, view_queryset
+from core.models import Recipe, Tag, Ingredient
+from recipe.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+# 0009_recipe_indexes_and_unique_names 新增的索引與唯一限制
+INDEXES = [
+    (Recipe, 'core_recipe_user_id_idx', False),
+    (Tag, 'unique_tag_name_per_user', True),
+    (Ingredient, 'unique_ingredient_name_per_user', True),
+]
+
+
+class Command(BaseCommand):
+    """Print EXPLAIN ANALYZE before/after the list indexes."""
+
+    help = 'Compare query plans of the list hot paths with/without indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--recipes', type=int, default=20000,
+                            help='Recipes per user.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rollback():
+            users = seed_dataset(
+                users=options['users'],
+                recipes_per_user=options['recipes'],
+                tags_per_user=500,
+                ingredients_per_user=2000,
+            )
+            user = users[0]
+            queries = self._queries(user)
+
+            after = self._run('with indexes', queries, options['repeat'])
+            self._drop_indexes()
+            before = self._run('without indexes', queries, options['repeat'])
+
+        self.stdout.write(self.style.SUCCESS('Summary (median ms):'))
+        for name in queries:
+            self.stdout.write(
+                f'  {name:<28} without {before[name]:8.2f}'
+                f'  with {after[name]:8.2f}')
+
+    def _queries(self, user):
+        """與 RecipeViewSet / TagViewSet / IngredientViewSet 列表相同的查詢"""
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)[:3])
+        names = [f'Ingredient {i}' for i in range(0, 60, 2)]
+        return {
+            'recipe list': view_queryset(RecipeViewSet, user)[:20],
+            'recipe list by tags': view_queryset(
+                RecipeViewSet, user,
+                {'tags': ','.join(str(tag_id) for tag_id in tag_ids)})[:20],
+            'tag list': view_queryset(TagViewSet, user)[:20],
+            'ingredient list': view_queryset(IngredientViewSet, user)[:20],
+            # 以名稱批次取得既有的食材 (recipe/bulk.py get_or_create_by_names)
+            'ingredient name lookup': Ingredient.objects.filter(
+                user=user, name__in=names),
+        }
+
+    def _run(self, label, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== {label} =='))
+        results = {}
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_LABEL(name))
+            self.stdout.write(queryset.explain(analyze=True))
+            results[name] = timed(lambda: list(queryset.all()), repeat)
+        return results
+
+    def _drop_indexes(self):
+        with connection.cursor() as cursor:
+            # 先檢查延遲的外鍵限制，否則同一個 transaction 內無法 ALTER TABLE
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            for model, name, is_constraint in INDEXES:
+                if is_constraint:
+                    cursor.execute(
+                        f'ALTER TABLE {model._meta.db_table} '
+                        f'DROP CONSTRAINT {name}')
+                else:
+                    cursor.execute(f'DROP INDEX {name}')
+            cursor.execute('ANALYZE')
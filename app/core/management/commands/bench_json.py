@@ -0,0 +1,68 @@
+"""
+Django command to benchmark JSON rendering and parsing of recipe payloads.
+以食譜列表的輸出 (20 / 100 / 1000 筆) 比較 DRF JSONRenderer 與
+FastJSONRenderer 的編碼時間，並以相同內容當作請求 (批次匯入) 比較兩個解析器
+"""
+import io
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmark import rollback, seed_dataset, timed
+from core.models import Recipe
+from core.parsers import FastJSONParser, orjson
+from core.renderers import FastJSONRenderer
+from recipe.queries import plan_recipe_queryset
+from recipe.serializers import RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Compare stdlib and orjson-backed JSON on recipe list payloads."""
+
+    help = 'Benchmark the API JSON renderer and parser.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,100,1000',
+                            help='Comma-separated list sizes.')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        repeat = options['repeat']
+        self.stdout.write(f'orjson installed: {orjson is not None}')
+
+        with rollback():
+            user, = seed_dataset(users=1, recipes_per_user=max(sizes))
+            serializer = RecipeDetailSerializer()
+            recipes = plan_recipe_queryset(
+                Recipe.objects.filter(user=user).order_by('-id'), serializer)
+            payloads = {
+                size: RecipeDetailSerializer(recipes[:size], many=True).data
+                for size in sizes
+            }
+
+        context = {'encoding': 'utf-8'}
+        results = []
+        for size, data in payloads.items():
+            body = JSONRenderer().render(data)
+            assert FastJSONRenderer().render(data) == body
+            results.append((
+                size,
+                len(body),
+                timed(lambda: JSONRenderer().render(data), repeat),
+                timed(lambda: FastJSONRenderer().render(data), repeat),
+                timed(lambda: JSONParser().parse(
+                    io.BytesIO(body), parser_context=context), repeat),
+                timed(lambda: FastJSONParser().parse(
+                    io.BytesIO(body), parser_context=context), repeat),
+            ))
+
+        self.stdout.write(self.style.SUCCESS('Median ms:'))
+        self.stdout.write(
+            f'  {"recipes":>8} {"bytes":>9} {"render":>8} {"fast":>8} '
+            f'{"parse":>8} {"fast":>8}')
+        for size, length, render, fast_render, parse, fast_parse in results:
+            self.stdout.write(
+                f'  {size:>8} {length:>9} {render:>8.3f} {fast_render:>8.3f} '
+                f'{parse:>8.3f} {fast_parse:>8.3f}')
@@ -0,0 +1,86 @@
+"""
+Django command to benchmark full-text recipe search.
+建立大量食譜後比較：GIN 索引的 search_vector、拿掉索引、每次即時計算 tsvector、
+以及 title / description 的 icontains 的查詢耗時；並量測寫入時更新
+search_vector 的成本
+"""
+from django.contrib.postgres.search import SearchQuery
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from core.benchmark import analyze, rollback, seed_dataset, timed
+from core.models import Recipe
+from recipe.search import (
+    search_recipes, search_vector_expression, update_search_vectors
+)
+
+
+class Command(BaseCommand):
+    """Compare search strategies on a large seeded dataset."""
+
+    help = 'Benchmark ?q= recipe search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--recipes', type=int, default=20000,
+                            help='Recipes per user.')
+        parser.add_argument('--query', default='garlic curry')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        text = options['query']
+        repeat = options['repeat']
+        with rollback():
+            users = seed_dataset(
+                users=options['users'],
+                recipes_per_user=options['recipes'],
+            )
+            recipes = Recipe.objects.filter(user__in=users)
+            update_search_vectors(recipes.values('id'))
+            analyze()
+
+            user_recipes = Recipe.objects.filter(user=users[0])
+            all_recipes = Recipe.objects.all()
+            query = SearchQuery(text, search_type='websearch')
+            words = Q()
+            for word in text.split():
+                words |= Q(title__icontains=word)
+                words |= Q(description__icontains=word)
+
+            cases = {
+                'stored vector (user)': search_recipes(user_recipes, text),
+                'stored vector (all users)': search_recipes(all_recipes, text),
+                'computed vector (user)': user_recipes.annotate(
+                    vector=search_vector_expression()).filter(vector=query),
+                'icontains (user)': user_recipes.filter(words),
+            }
+            results = self._run('GIN index', cases, repeat)
+
+            sample = recipes.values_list('id', flat=True)[:1]
+            write_ms = timed(
+                lambda: update_search_vectors(list(sample)), repeat)
+
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                cursor.execute('DROP INDEX core_recipe_search_idx')
+            name = 'stored vector (all users)'
+            without = self._run(
+                'without GIN index', {name: cases[name]}, repeat)
+
+        self.stdout.write(self.style.SUCCESS('Summary (median ms):'))
+        for name, ms in results.items():
+            self.stdout.write(f'  {name:<28} {ms:8.2f}')
+        for name, ms in without.items():
+            self.stdout.write(f'  {name + " (no index)":<28} {ms:8.2f}')
+        self.stdout.write(f'  {"update one recipe":<28} {write_ms:8.2f}')
+
+    def _run(self, label, cases, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== {label} =='))
+        results = {}
+        for name, queryset in cases.items():
+            page = queryset[:20]
+            self.stdout.write(self.style.MIGRATE_LABEL(name))
+            self.stdout.write(page.explain(analyze=True))
+            results[name] = timed(lambda: list(page.all()), repeat)
+        return results
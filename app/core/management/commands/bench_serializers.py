@@ -0,0 +1,65 @@
+"""
+Django command to benchmark recipe list rendering.
+比較 RecipeSerializer 與 .values() 快速輸出 (recipe/fastpath.py) 在
+100 / 1k / 10k 筆食譜時的耗時：只計算輸出 (資料已載入) 以及含查詢與 JSON 編碼
+"""
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmark import rollback, seed_dataset, timed
+from core.models import Recipe
+from recipe.fastpath import RowRenderer
+from recipe.queries import plan_recipe_queryset
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Compare serializer and fast-path rendering of recipe lists."""
+
+    help = 'Benchmark RecipeSerializer against the .values() fast path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000',
+                            help='Comma-separated list sizes.')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        repeat = options['repeat']
+        json = JSONRenderer()
+        serializer = RecipeSerializer()
+        renderer = RowRenderer.for_serializer(serializer)
+        results = []
+
+        with rollback():
+            user, = seed_dataset(users=1, recipes_per_user=max(sizes))
+            recipes = Recipe.objects.filter(user=user).order_by('-id')
+            instances_qs = plan_recipe_queryset(recipes, serializer)
+            rows_qs = recipes.values(*renderer.columns)
+
+            for size in sizes:
+                instances = list(instances_qs[:size])
+                rows = list(rows_qs[:size])
+                assert (json.render(RecipeSerializer(
+                    instances, many=True).data) ==
+                    json.render(renderer.render(rows)))
+
+                results.append((
+                    size,
+                    timed(lambda: RecipeSerializer(
+                        instances, many=True).data, repeat),
+                    timed(lambda: renderer.render(rows), repeat),
+                    timed(lambda: json.render(RecipeSerializer(
+                        instances_qs[:size], many=True).data), repeat),
+                    timed(lambda: json.render(
+                        renderer.render(rows_qs[:size])), repeat),
+                ))
+
+        self.stdout.write(self.style.SUCCESS('Median ms:'))
+        self.stdout.write(
+            f'  {"recipes":>8} {"serializer":>11} {"fast path":>10} '
+            f'{"serializer+query":>17} {"fast+query":>11}')
+        for size, slow, fast, slow_total, fast_total in results:
+            self.stdout.write(
+                f'  {size:>8} {slow:>11.2f} {fast:>10.2f} '
+                f'{slow_total:>17.2f} {fast_total:>11.2f}')
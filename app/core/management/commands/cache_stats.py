@@ -0,0 +1,29 @@
+"""
+Django command to show the recipe response cache hit / miss counters.
+計數由 recipe/cache.py 累計在共用快取 (所有 worker 合計)；--reset 印出後歸零，
+方便比較調整 RECIPE_CACHE_TIMEOUT 前後的命中率
+"""
+from django.core.management.base import BaseCommand
+
+from recipe.cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    """Print recipe / tag / ingredient response cache statistics."""
+
+    help = 'Show response cache hit / miss counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset the counters after printing.')
+
+    def handle(self, *args, **options):
+        stats = get_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f'hits {stats["hits"]}  misses {stats["misses"]}  '
+            f'hit ratio {ratio:.1%}')
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write('Counters reset.')
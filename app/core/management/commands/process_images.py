@@ -0,0 +1,35 @@
+"""
+Django command to process uploaded recipe images in the background.
+由 uWSGI attach-daemon 常駐執行 (scripts/run.sh)；--once 處理完目前佇列即結束
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from recipe.tasks import process_pending_images, run_worker
+
+
+class Command(BaseCommand):
+    """Generate image variants for recipes queued by upload_image."""
+
+    help = 'Process pending recipe images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue and exit.')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = process_pending_images()
+            self.stdout.write(f'Processed {count} image(s).')
+            return
+
+        stopping = []
+        # 收到 SIGTERM / SIGINT 時處理完手上這張才結束
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stopping.append(True))
+
+        self.stdout.write('Processing recipe images...')
+        run_worker(options['poll_interval'], should_stop=lambda: stopping)
+        self.stdout.write('Image worker stopped.')
@@ -0,0 +1,85 @@
+"""
+Django command to rebuild or verify the denormalized recipe summaries.
+依 id 分批重新計算 Recipe.tags_summary / ingredients_summary (recipe/summaries.py)、
+Recipe.search_vector (recipe/search.py；在寫入提交後才更新，失敗時只能由此修復)
+與 Tag / Ingredient.recipe_count (recipe/counts.py)，
+每批各自一個 transaction，避免長時間鎖住整個資料表
+--verify 只比對不寫入，有不一致的資料時以錯誤結束
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.counts import find_stale_counts, refresh_recipe_counts
+from recipe.search import find_stale_search_vectors, update_search_vectors
+from recipe.summaries import find_stale_summaries, refresh_summaries
+
+
+class Command(BaseCommand):
+    """Rebuild summaries, search vectors and recipe counts."""
+
+    help = ('Rebuild or verify denormalized recipe tag / ingredient '
+            'summaries, search vectors and recipe counts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report stale rows, do not write.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self._verify()
+            return
+
+        batch_size = options['batch_size']
+        total = self._rebuild(Recipe, batch_size, self._refresh_recipes)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt summaries and search vectors for {total} recipe(s).'))
+        for model in (Tag, Ingredient):
+            total = self._rebuild(
+                model, batch_size,
+                lambda batch, model=model: refresh_recipe_counts(model, batch))
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt recipe counts for {total} '
+                f'{model._meta.verbose_name}(s).'))
+
+    def _rebuild(self, model, batch_size, refresh):
+        """依 id 分批呼叫 refresh(ids)，回傳處理筆數"""
+        ids = model.objects.order_by('id').values_list('id', flat=True)
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return total
+            with transaction.atomic():
+                refresh(batch)
+            total += len(batch)
+            last_id = batch[-1]
+
+    def _refresh_recipes(self, ids):
+        refresh_summaries(ids)
+        update_search_vectors(ids)
+
+    def _verify(self):
+        problems = []
+        recipes = Recipe.objects.order_by('id')
+        stale = list(find_stale_summaries(recipes))
+        if stale:
+            problems.append(self._describe('recipe summaries', stale))
+        stale = list(find_stale_search_vectors(recipes))
+        if stale:
+            problems.append(self._describe('recipe search vectors', stale))
+        for model in (Tag, Ingredient):
+            stale = list(find_stale_counts(model.objects.order_by('id')))
+            if stale:
+                problems.append(self._describe(
+                    f'{model._meta.verbose_name} recipe counts', stale))
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS(
+            'All recipe summaries, search vectors and counts match.'))
+
+    def _describe(self, label, ids):
+        sample = ', '.join(str(pk) for pk in ids[:20])
+        return f'{len(ids)} stale {label}: {sample}'
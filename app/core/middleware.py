@@ -0,0 +1,193 @@
+"""
+回應壓縮
+- 依 Accept-Encoding (含 q 值) 選擇 br (有安裝 brotli 時) 或 gzip；
+  q 值相同時以 br 優先 (壓縮率較好，低 quality 時也比 gzip 快)
+- 只壓縮文字類的內容 (JSON / NDJSON / CSS / JS 等)；圖片等已壓縮的媒體直接略過。
+  HTML 也不壓縮：頁面含 CSRF token，壓縮後可能被 BREACH 類的攻擊推測內容
+- 小於 RESPONSE_COMPRESSION_MIN_SIZE 的回應不壓縮 (省下的傳輸量不值得 CPU 與標頭)
+- 串流回應 (例如 NDJSON 匯出) 逐段壓縮，每段都 flush，客戶端不需等全部產生完
+"""
+import gzip
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'application/vnd.oai.openapi',
+    'image/svg+xml',
+    'text/css',
+    'text/csv',
+    'text/javascript',
+    'text/plain',
+}
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def compressor(self):
+        return _ZlibStream(zlib.compressobj(
+            self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS))
+
+
+class _ZlibStream:
+    def __init__(self, compressobj):
+        self._compressobj = compressobj
+
+    def process(self, chunk):
+        return (self._compressobj.compress(chunk) +
+                self._compressobj.flush(zlib.Z_SYNC_FLUSH))
+
+    def finish(self):
+        return self._compressobj.flush()
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(
+            data, mode=brotli.MODE_TEXT, quality=self.quality)
+
+    def compressor(self):
+        return _BrotliStream(brotli.Compressor(
+            mode=brotli.MODE_TEXT, quality=self.quality))
+
+
+class _BrotliStream:
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def process(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def available_codecs():
+    """伺服器端支援的編碼，依偏好排序"""
+    codecs = [GzipCodec(settings.RESPONSE_COMPRESSION_GZIP_LEVEL)]
+    if brotli is not None:
+        codecs.insert(
+            0, BrotliCodec(settings.RESPONSE_COMPRESSION_BROTLI_QUALITY))
+    return codecs
+
+
+def parse_accept_encoding(header):
+    """'br;q=1.0, gzip;q=0.8, *;q=0' -> {'br': 1.0, 'gzip': 0.8, '*': 0.0}"""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate(header, codecs):
+    """選出客戶端接受 (q > 0) 且 q 值最高的編碼；都不接受時回傳 None"""
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for codec in codecs:
+        quality = accepted.get(codec.name, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = codec, quality
+    return best
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '')
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith('+json')
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress text responses with brotli or gzip per Accept-Encoding."""
+
+    def process_response(self, request, response):
+        if (response.has_header('Content-Encoding') or
+                response.status_code == 206 or
+                'no-transform' in response.get('Cache-Control', '') or
+                not is_compressible(response)):
+            return response
+        if (not response.streaming and
+                len(response.content) <
+                settings.RESPONSE_COMPRESSION_MIN_SIZE):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), available_codecs())
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _compress_async(
+                    codec, response.streaming_content)
+            else:
+                response.streaming_content = _compress_sequence(
+                    codec, response.streaming_content)
+            # 壓縮後的長度要串流完才知道
+            del response.headers['Content-Length']
+        else:
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # 與 Django 的 GZipMiddleware 相同：內容編碼後強 ETag 改為弱 ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codec.name
+        return response
+
+
+def _compress_sequence(codec, chunks):
+    compressor = codec.compressor()
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _compress_async(codec, chunks):
+    compressor = codec.compressor()
+    async for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
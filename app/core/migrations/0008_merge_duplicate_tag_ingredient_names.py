@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:20
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    加上 (user, name) 唯一限制前，先合併同一使用者重複名稱的 Tag / Ingredient
+    保留 id 最小的一筆，並把食譜關聯移到保留的那筆
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for field_name, target_column in (
+            ('tags', 'tag_id'), ('ingredients', 'ingredient_id')):
+        through = getattr(Recipe, field_name).through
+        model = Recipe._meta.get_field(field_name).related_model
+
+        duplicates = (
+            model.objects.values('user', 'name')
+            .annotate(count=Count('id'), keep_id=Min('id'))
+            .filter(count__gt=1)
+        )
+        for group in duplicates:
+            drop_ids = list(
+                model.objects.filter(user=group['user'], name=group['name'])
+                .exclude(id=group['keep_id'])
+                .values_list('id', flat=True)
+            )
+            linked = set(
+                through.objects.filter(**{target_column: group['keep_id']})
+                .values_list('recipe_id', flat=True)
+            )
+            for row in through.objects.filter(
+                    **{f'{target_column}__in': drop_ids}):
+                if row.recipe_id in linked:
+                    row.delete()
+                else:
+                    setattr(row, target_column, group['keep_id'])
+                    row.save()
+                    linked.add(row.recipe_id)
+            model.objects.filter(id__in=drop_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_alter_recipe_description'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+def queue_existing_images(apps, schema_editor):
+    """已上傳的圖片還沒有縮圖，排入背景佇列補產生"""
+    Recipe = apps.get_model('core', 'Recipe')
+    Recipe.objects.exclude(image__isnull=True).exclude(image='').update(
+        image_status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_indexes_and_unique_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(choices=[('none', 'No image'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('image_status', 'pending')), fields=['id'], name='core_recipe_image_pending_idx'),
+        ),
+        migrations.RunPython(
+            queue_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:41
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vectors(apps, schema_editor):
+    """為既有食譜計算 search_vector (與 recipe/search.py 相同的權重)"""
+    Recipe = apps.get_model('core', 'Recipe')
+    config = getattr(settings, 'RECIPE_SEARCH_CONFIG', 'simple')
+
+    def names(model_name):
+        model = apps.get_model('core', model_name)
+        return Subquery(
+            model.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe')
+            .annotate(names=StringAgg('name', ' '))
+            .values('names')
+        )
+
+    Recipe.objects.update(search_vector=(
+        SearchVector('title', weight='A', config=config) +
+        SearchVector('description', weight='B', config=config) +
+        SearchVector(names('Tag'), weight='C', config=config) +
+        SearchVector(names('Ingredient'), weight='C', config=config)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+        migrations.RunPython(
+            populate_search_vectors, migrations.RunPython.noop),
+    ]
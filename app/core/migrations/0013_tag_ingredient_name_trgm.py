@@ -0,0 +1,61 @@
+"""
+標籤 / 食材名稱的 pg_trgm GIN 索引 (自動完成用)
+pg_trgm 屬於 contrib 套件，部分 Postgres 安裝沒有提供；
+此時略過 extension 與索引，自動完成退回只做開頭比對 (recipe/autocomplete.py)
+"""
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+INDEXES = [
+    ('core_tag', 'core_tag_name_trgm_idx'),
+    ('core_ingredient', 'core_ingredient_name_trgm_idx'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, name in INDEXES:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+                f'USING gin (name gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for _, name in INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='tag',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=['name'], name='core_tag_name_trgm_idx',
+                        opclasses=['gin_trgm_ops']),
+                ),
+                migrations.AddIndex(
+                    model_name='ingredient',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=['name'], name='core_ingredient_name_trgm_idx',
+                        opclasses=['gin_trgm_ops']),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(
+                    create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:51
+
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, JSONObject
+
+
+def populate_summaries(apps, schema_editor):
+    """為既有食譜建立標籤 / 食材的 summary (與 recipe/summaries.py 相同格式)"""
+    Recipe = apps.get_model('core', 'Recipe')
+
+    def summary(model_name):
+        model = apps.get_model('core', model_name)
+        return Coalesce(
+            Subquery(
+                model.objects.filter(recipe=OuterRef('pk'))
+                .values('recipe')
+                .annotate(items=JSONBAgg(
+                    JSONObject(id='id', name='name'), ordering='id'))
+                .values('items')
+            ),
+            Value([], output_field=models.JSONField()),
+        )
+
+    Recipe.objects.update(
+        tags_summary=summary('Tag'),
+        ingredients_summary=summary('Ingredient'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_tag_ingredient_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_summary',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_summary',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(
+            populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_recipe_counts(apps, schema_editor):
+    """計算既有標籤 / 食材的使用次數 (與 recipe/counts.py 相同)"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name in (('Tag', 'tags'),
+                                   ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        target = field.m2m_reverse_field_name()
+        model.objects.update(recipe_count=Coalesce(
+            Subquery(
+                through.objects.filter(**{target: OuterRef('pk')})
+                .values(target)
+                .annotate(count=Count('*'))
+                .values('count')
+            ),
+            Value(0),
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recipe_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            populate_recipe_counts, migrations.RunPython.noop),
+    ]
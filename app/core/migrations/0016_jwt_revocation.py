@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_attr_recipe_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JWTRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, null=True, unique=True)),
+                ('user_id', models.BigIntegerField()),
+                ('revoked_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -11,11 +11,15 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
 )
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models import CharField, DecimalField, IntegerField
 
+from .storage import get_image_storage
+
 
 def recipe_image_file_path(instance, filename):
-    """生成圖片路徑"""
+    """生成圖片路徑 (儲存時檔名會換成內容雜湊，見 core/storage.py)"""
     ext = os.path.splitext(filename)[1]
     filename = f'{uuid.uuid4()}{ext}'
 
@@ -64,6 +68,15 @@ class Recipe(models.Model):
     食譜Table
     auth_user_model定義為User()
     """
+
+    class ImageStatus(models.TextChoices):
+        """圖片縮圖的處理狀態 (見 recipe/tasks.py)"""
+        NONE = 'none', 'No image'
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -75,7 +88,40 @@ class Recipe(models.Model):
     link = CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')  # 一個Recipe 可以有多個Tag 一個Tag也可屬於多個Recipe
     ingredients = models.ManyToManyField('Ingredient')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True, upload_to=recipe_image_file_path,
+        storage=get_image_storage)  # 以內容雜湊命名，相同圖片只存一份
+    image_status = CharField(
+        max_length=16, choices=ImageStatus.choices,
+        default=ImageStatus.NONE)  # 背景處理圖片，pending 的食譜即為待處理佇列
+    image_claimed_at = models.DateTimeField(
+        null=True, editable=False)  # worker 取出處理的時間，用來找回中斷的工作
+    search_vector = SearchVectorField(
+        null=True, editable=False)  # 全文搜尋，由 recipe/search.py 維護
+    # 標籤 / 食材的反正規化副本 [{'id', 'name'}]，列表不需讀多對多資料表
+    # 由 recipe/summaries.py 在同一個 transaction 內維護
+    tags_summary = models.JSONField(default=list, editable=False)
+    ingredients_summary = models.JSONField(default=list, editable=False)
+
+    class Meta:
+        indexes = [
+            # 列表查詢：WHERE user_id = ? ORDER BY id DESC
+            models.Index(
+                fields=['user', 'id'], name='core_recipe_user_id_idx'),
+            # 背景 worker 取待處理的圖片，只索引 pending 的少數資料
+            models.Index(
+                fields=['id'], name='core_recipe_image_pending_idx',
+                condition=models.Q(image_status='pending')),
+            # 找出處理中斷 (取出太久仍未完成) 的工作
+            models.Index(
+                fields=['image_claimed_at'],
+                name='core_recipe_image_claimed_idx',
+                condition=models.Q(image_status='processing')),
+            # 刪除 / 換圖時檢查圖片是否仍被其他食譜參照
+            models.Index(fields=['image'], name='core_recipe_image_idx'),
+            # ?q= 全文搜尋
+            GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -88,6 +134,21 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )  # many to one 若User被刪除 連同這個Tag Object一併刪除
     name = CharField(max_length=255)
+    recipe_count = models.PositiveIntegerField(
+        default=0, editable=False)  # 使用中的食譜數，由 recipe/counts.py 維護
+
+    class Meta:
+        constraints = [
+            # 同一使用者的標籤名稱不可重複；唯一索引 (user_id, name)
+            # 同時支援列表的 ORDER BY name 以及 get_or_create 的名稱查詢
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='unique_tag_name_per_user'),
+        ]
+        indexes = [
+            # 自動完成：name ILIKE 'abc%' 與 pg_trgm 相似度查詢
+            GinIndex(fields=['name'], name='core_tag_name_trgm_idx',
+                     opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.name
@@ -98,6 +159,37 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE,)
+    recipe_count = models.PositiveIntegerField(
+        default=0, editable=False)  # 同 Tag
+
+    class Meta:
+        constraints = [
+            # 同 Tag：同一使用者的食材名稱不可重複
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_name_per_user'),
+        ]
+        indexes = [
+            # 同 Tag：自動完成用
+            GinIndex(fields=['name'], name='core_ingredient_name_trgm_idx',
+                     opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class JWTRevocation(models.Model):
+    """
+    JWT 撤銷紀錄 (user/revocation.py)，每次撤銷新增一列
+    jti 有值：撤銷單一 access token (登出)
+    jti 為空：撤銷該使用者在 revoked_at 以前簽發的所有 token (停用 / 刪除帳號)
+    """
+    jti = models.CharField(max_length=255, null=True, unique=True)
+    user_id = models.BigIntegerField()  # 不用外鍵：使用者刪除後紀錄仍須保留
+    revoked_at = models.DateTimeField()
+    # 此時間以後相關的 token 都已過期，紀錄可以刪除
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti or f'user {self.user_id}'
@@ -0,0 +1,40 @@
+"""
+API 共用的 JSON 解析器
+有安裝 orjson 時以 orjson 解析 UTF-8 的請求內容，其餘情況與 DRF 的 JSONParser 相同
+"""
+import codecs
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """
+    與 stdlib 唯一的差異：超過 64 位元的整數會解析成 float
+    (API 的整數 / Decimal 欄位都有上限，這類數值本來就會驗證失敗；
+    事先掃描請求內容找出長數字的成本比解析本身還高，因此不特別處理)
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # 交給 stdlib 解析：接受 orjson 不支援的寫法 (例如 STRICT_JSON 關閉時
+            # 的 NaN)，或回報與原本相同的錯誤訊息
+            return super().parse(
+                io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,133 @@
+"""
+內容定址的檔案儲存
+檔名由內容的 sha256 決定 (uploads/recipe/<sha256>.jpg)：
+- 同一張圖片上傳到多個食譜只存一份
+- 同一個網址的內容永遠不變，nginx 可以設定長期快取 (immutable)
+檔案可能被多個食譜共用，刪除前須確認沒有其他參照 (見 recipe/images.py)；
+共用與刪除以 lock_content 互斥，避免刪掉剛被另一個請求共用、尚未 commit 的檔案
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+
+from .middleware import GzipCodec
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+# 預先壓縮的靜態檔案類型；圖片 (svg 以外) 與 woff / woff2 字型本身已壓縮
+PRECOMPRESS_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml',
+    '.html', '.ico', '.ttf', '.otf', '.eot',
+}
+
+
+def content_digest(content):
+    """
+    計算內容的 sha256
+    串流上傳 (recipe/uploads.py) 已在接收時算好，直接沿用 content_hash
+    """
+    digest = getattr(content, 'content_hash', None)
+    if digest:
+        return digest
+
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+def lock_content(name):
+    """
+    取得某個檔名的 PostgreSQL advisory lock，transaction 結束時自動釋放
+    - 上傳：持有鎖檢查檔案是否存在，直到食譜的參照 commit
+    - 刪除：持有鎖確認沒有參照後才刪除檔案
+    參照數以查詢食譜取得而不另存計數，不會與實際參照不一致
+    """
+    digest = hashlib.sha256(name.encode()).digest()
+    key = int.from_bytes(digest[:8], 'big', signed=True)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """檔名改為內容雜湊；相同內容已存在時不再寫入"""
+
+    def hashed_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, f'{digest}{ext}')
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content_digest(content))
+        if connection.in_atomic_block:
+            # 呼叫端的 transaction (上傳 API / admin) commit 前，
+            # release_image 無法刪除這個檔案
+            lock_content(name)
+        if self.exists(name):
+            return name  # 重複的內容直接共用既有檔案
+        return super().save(name, content, max_length=max_length)
+
+    def save_derived(self, name, content):
+        """
+        儲存由內容定址檔案衍生的檔案 (例如縮圖)，名稱不再雜湊：
+        衍生檔名本身已由原檔雜湊決定，存在即代表內容相同
+        """
+        if self.exists(name):
+            return name
+        return super().save(name, content)
+
+
+_image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    """給 Recipe.image 使用 (callable，設定變更時不需新增 migration)"""
+    return _image_storage
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic 時：
+    - 檔名加上內容雜湊 (admin/css/base.<hash>.css)，網址內容不變，
+      nginx 可設定長期快取 (immutable)
+    - 在雜湊後的檔案旁寫入最高壓縮等級的 .gz，
+      nginx 以 gzip_static 直接送出，不需在每次請求時壓縮
+      (不產生 .br：nginx 映像檔沒有 ngx_brotli 的 brotli_static，送不出去)
+    只在 DEBUG 關閉時使用 (需先執行 collectstatic 產生 manifest)
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        codecs = [('.gz', GzipCodec(9))]
+        for name in set(self.hashed_files.values()):
+            self.precompress(name, codecs)
+
+    def precompress(self, name, codecs):
+        if os.path.splitext(name)[1].lower() not in PRECOMPRESS_EXTENSIONS:
+            return
+        with self.open(name) as f:
+            content = f.read()
+        if len(content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return
+        for suffix, codec in codecs:
+            compressed_name = name + suffix
+            # 檔名含內容雜湊：已存在即代表內容相同 (重複執行 collectstatic)
+            if self.exists(compressed_name):
+                continue
+            compressed = codec.compress(content)
+            if len(compressed) < len(content):
+                self._save(compressed_name, ContentFile(compressed))
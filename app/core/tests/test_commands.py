@@ -2,12 +2,15 @@
 Test custom Django management commands.
 """
 
+from io import StringIO
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2OpError
 from django.core.management import call_command
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
+from recipe.tasks import run_worker
+
 
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandTests(SimpleTestCase):
@@ -27,3 +30,30 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class ProcessImagesCommandTests(SimpleTestCase):
+    """Test the background image worker command."""
+
+    @patch('core.management.commands.process_images.process_pending_images')
+    def test_process_images_once(self, patched_process):
+        """Test --once drains the queue and exits."""
+        patched_process.return_value = 2
+        call_command('process_images', '--once', stdout=StringIO())
+        patched_process.assert_called_once_with()
+
+    @patch('recipe.tasks.time.sleep')
+    @patch('recipe.tasks.close_old_connections')
+    @patch('recipe.tasks.requeue_stale_images', return_value=0)
+    @patch('recipe.tasks.process_next_image')
+    def test_worker_polls_when_idle(self, patched_next, patched_requeue,
+                                    patched_close, patched_sleep):
+        """Test the worker sleeps only when the queue is empty."""
+        patched_next.side_effect = [1, None, 2]
+        calls = iter([False, False, False, True])
+
+        run_worker(poll_interval=0.5, should_stop=lambda: next(calls))
+
+        self.assertEqual(patched_next.call_count, 3)
+        self.assertEqual(patched_requeue.call_count, 3)
+        patched_sleep.assert_called_once_with(0.5)
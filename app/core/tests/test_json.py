@@ -0,0 +1,100 @@
+"""
+Tests for the orjson-backed renderer and parser.
+"""
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+SAMPLE = ReturnList([
+    ReturnDict({
+        'id': 1,
+        'title': 'Soupe à l’oignon 晚餐',
+        'price': '5.00',
+        'raw_price': Decimal('12.50'),
+        'label': gettext_lazy('Recipe'),
+        'created': datetime.datetime(
+            2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        'day': datetime.date(2024, 5, 1),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'tags': [{'id': 2, 'name': 'line break '}],
+        'counts': {3: 1},
+        'link': None,
+        'ratio': 0.1,
+    }, serializer=None),
+], serializer=None)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test FastJSONRenderer matches DRF's JSONRenderer byte for byte."""
+
+    def assertSameOutput(self, data, media_type=None, context=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type, context),
+            JSONRenderer().render(data, media_type, context))
+
+    def test_matches_stdlib(self):
+        """Test decimals, lazy strings, dates and separators render alike."""
+        self.assertSameOutput(SAMPLE)
+        self.assertSameOutput({'nested': [SAMPLE, [], {}]})
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_big_int_falls_back(self):
+        """Test values orjson cannot encode go through the stdlib."""
+        self.assertSameOutput({'big': 2 ** 70})
+
+    def test_indent_uses_stdlib(self):
+        """Test indented output is produced by the stdlib renderer."""
+        self.assertSameOutput(SAMPLE, 'application/json; indent=4')
+
+    def test_without_orjson(self):
+        """Test the renderer works when orjson is not installed."""
+        with patch('core.renderers.orjson', None):
+            self.assertSameOutput(SAMPLE)
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test FastJSONParser accepts what DRF's JSONParser accepts."""
+
+    def parse(self, parser, body, encoding='utf-8'):
+        return parser.parse(
+            io.BytesIO(body), parser_context={'encoding': encoding})
+
+    def assertSameParse(self, body, encoding='utf-8'):
+        self.assertEqual(
+            self.parse(FastJSONParser(), body, encoding),
+            self.parse(JSONParser(), body, encoding))
+
+    def test_matches_stdlib(self):
+        """Test documents parse to the same data."""
+        self.assertSameParse(
+            '{"title": "晚餐", "price": "5.00", "tags": [{"name": "a"}], '
+            '"n": 1.5, "ok": true, "none": null}'.encode())
+        self.assertSameParse('{"title": "café"}'.encode('latin-1'),
+                             encoding='latin-1')
+
+    def test_invalid_json(self):
+        """Test rejected bodies raise the same ParseError as the stdlib."""
+        for body in (b'{"title": ', b'{"value": NaN}'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    self.parse(JSONParser(), body)
+                with self.assertRaisesMessage(
+                        ParseError, str(expected.exception)):
+                    self.parse(FastJSONParser(), body)
+
+    def test_without_orjson(self):
+        """Test the parser works when orjson is not installed."""
+        with patch('core.parsers.orjson', None):
+            self.assertSameParse(b'{"title": "Soup"}')
@@ -0,0 +1,137 @@
+"""
+Tests for the response compression middleware.
+"""
+import gzip
+from unittest import skipUnless
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import CompressionMiddleware, brotli, negotiate
+from core.middleware import BrotliCodec, GzipCodec
+
+BODY = b'{"id": 1, "title": "Sample recipe", "tags": []}' * 100
+
+
+def run(response, accept_encoding='gzip, deflate, br'):
+    request = RequestFactory().get(
+        '/', HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware(lambda req: response)(request)
+
+
+def json_response(body=BODY, **headers):
+    response = HttpResponse(body, content_type='application/json')
+    for name, value in headers.items():
+        response.headers[name] = value
+    return response
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test negotiated compression of API responses."""
+
+    def test_negotiate(self):
+        """Test the highest q value wins and q=0 refuses a coding."""
+        codecs = [BrotliCodec(4), GzipCodec(6)]
+        cases = [
+            ('gzip, br', 'br'),
+            ('gzip', 'gzip'),
+            ('br;q=0.5, gzip', 'gzip'),
+            ('br;q=0, *', 'gzip'),
+            ('*', 'br'),
+            ('identity', None),
+            ('gzip;q=0', None),
+            ('', None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                codec = negotiate(header, codecs)
+                self.assertEqual(codec and codec.name, expected)
+
+    def test_gzip(self):
+        """Test JSON is gzipped with Content-Length and Vary updated."""
+        response = run(json_response(), 'gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        """Test brotli is used when the client accepts it."""
+        response = run(json_response())
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+
+    def test_small_response_untouched(self):
+        """Test responses below the size threshold are not compressed."""
+        response = run(json_response(b'{"id": 1}'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+        self.assertEqual(response.content, b'{"id": 1}')
+
+    def test_not_accepted(self):
+        """Test clients without a supported coding get the plain body."""
+        response = run(json_response(), 'identity')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.content, BODY)
+
+    def test_skips_images_and_html(self):
+        """Test already compressed media and HTML are left alone."""
+        for content_type in ('image/jpeg', 'image/png', 'text/html'):
+            with self.subTest(content_type=content_type):
+                response = run(HttpResponse(BODY, content_type=content_type))
+
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, BODY)
+
+    def test_skips_encoded_and_no_transform(self):
+        """Test encoded or no-transform responses are not recompressed."""
+        responses = [
+            json_response(**{'Content-Encoding': 'gzip'}),
+            json_response(**{'Cache-Control': 'private, no-transform'}),
+        ]
+        for response in responses:
+            with self.subTest(headers=dict(response.headers)):
+                self.assertEqual(run(response).content, BODY)
+
+    def test_weakens_etag(self):
+        """Test a strong ETag becomes weak once the body is encoded."""
+        response = run(json_response(ETag='"abc"'), 'gzip')
+
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    def test_streaming(self):
+        """Test streamed responses are compressed chunk by chunk."""
+        chunks = [b'{"id": %d}\n' % i * 50 for i in range(20)]
+        response = StreamingHttpResponse(
+            iter(chunks), content_type='application/x-ndjson')
+
+        response = run(response, 'gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        parts = list(response.streaming_content)
+        # 每段都 flush，不會等到最後才輸出
+        self.assertGreater(len(parts), len(chunks))
+        self.assertEqual(gzip.decompress(b''.join(parts)), b''.join(chunks))
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_streaming_brotli(self):
+        """Test streamed responses can be brotli compressed."""
+        chunks = [b'{"id": %d}\n' % i * 50 for i in range(20)]
+        response = StreamingHttpResponse(
+            iter(chunks), content_type='application/x-ndjson')
+
+        response = run(response, 'br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            brotli.decompress(b''.join(response.streaming_content)),
+            b''.join(chunks))
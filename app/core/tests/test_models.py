@@ -1,6 +1,7 @@
 """
 Tests for models.
 """
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from decimal import Decimal
@@ -121,3 +122,21 @@ class ModelTests(TestCase):
 
         self.assertIn(ingredient1, recipe.ingredients.all())
         self.assertIn(ingredient2, recipe.ingredients.all())
+
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        other = create_user(email='other@example.com')
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(user=other, name='Vegan')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
+
+    def test_ingredient_name_unique_per_user(self):
+        """Test a user cannot have two ingredients with the same name."""
+        user = create_user()
+        models.Ingredient.objects.create(user=user, name='Salt')
+
+        with self.assertRaises(IntegrityError):
+            models.Ingredient.objects.create(user=user, name='Salt')
@@ -0,0 +1,116 @@
+"""
+Tests for the content-addressed storage.
+"""
+import gzip
+import hashlib
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from core.storage import (
+    CompressedManifestStaticFilesStorage,
+    ContentAddressedStorage,
+)
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    """Test files are named and deduplicated by content."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_name_is_content_hash(self):
+        """Test saved files are named by their sha256."""
+        data = b'image bytes'
+
+        name = self.storage.save('uploads/recipe/a.JPG', ContentFile(data))
+
+        digest = hashlib.sha256(data).hexdigest()
+        self.assertEqual(name, f'uploads/recipe/{digest}.jpg')
+
+    def test_same_content_stored_once(self):
+        """Test identical uploads share one file."""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'same'))
+        second = self.storage.save('uploads/b.jpg', ContentFile(b'same'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.storage.listdir('uploads')[1]), 1)
+
+    def test_different_content_stored_separately(self):
+        """Test different uploads get different names."""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'one'))
+        second = self.storage.save('uploads/a.jpg', ContentFile(b'two'))
+
+        self.assertNotEqual(first, second)
+
+    def test_precomputed_hash_used(self):
+        """Test a hash computed while streaming is reused."""
+        content = ContentFile(b'data')
+        content.content_hash = 'f' * 64
+
+        name = self.storage.save('uploads/a.png', content)
+
+        self.assertEqual(name, f'uploads/{"f" * 64}.png')
+
+    def test_save_derived_keeps_name(self):
+        """Test derived files keep their exact name."""
+        name = self.storage.save_derived(
+            'uploads/abc_thumbnail.webp', ContentFile(b'thumb'))
+
+        self.assertEqual(name, 'uploads/abc_thumbnail.webp')
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=1024)
+class CompressedManifestStaticFilesStorageTests(SimpleTestCase):
+    """Test collectstatic writes hashed names and precompressed copies."""
+
+    CSS = b'body { color: #333; margin: 0 auto; }\n' * 100
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = CompressedManifestStaticFilesStorage(
+            location=self.tmpdir.name, base_url='/static/')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def collect(self, files):
+        for name, content in files.items():
+            self.storage.save(name, ContentFile(content))
+        paths = {name: (self.storage, name) for name in files}
+        list(self.storage.post_process(paths))
+
+    def test_hashed_file_precompressed(self):
+        """Test hashed text assets get a .gz sibling with the same body."""
+        self.collect({'admin/base.css': self.CSS})
+
+        name = self.storage.stored_name('admin/base.css')
+        self.assertRegex(name, r'^admin/base\.[0-9a-f]{12}\.css$')
+        with self.storage.open(name + '.gz') as f:
+            self.assertEqual(gzip.decompress(f.read()), self.CSS)
+        self.assertFalse(self.storage.exists('admin/base.css.gz'))
+
+    def test_no_brotli_copy(self):
+        """Test no .br sibling is written (nginx cannot serve it)."""
+        self.collect({'admin/base.css': self.CSS})
+
+        name = self.storage.stored_name('admin/base.css')
+        self.assertFalse(self.storage.exists(name + '.br'))
+
+    def test_small_and_binary_files_skipped(self):
+        """Test tiny files and already compressed formats are not copied."""
+        self.collect({
+            'small.css': b'a{}',
+            'logo.png': self.CSS,
+            'font.woff2': self.CSS,
+        })
+
+        for name in ('small.css', 'logo.png', 'font.woff2'):
+            with self.subTest(name=name):
+                hashed = self.storage.stored_name(name)
+                self.assertFalse(self.storage.exists(hashed + '.gz'))
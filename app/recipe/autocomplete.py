@@ -0,0 +1,104 @@
+"""
+標籤 / 食材名稱自動完成
+- 先找開頭相符的名稱 (ILIKE 'abc%')，不足 limit 筆時再以 pg_trgm 的
+  word similarity 找拼字相近的名稱；兩者都可使用 name 上的 gin_trgm_ops 索引
+- 資料庫沒有 pg_trgm extension 時只做開頭比對
+- 每個 process 保留最近查詢的結果 (LRU)，key 含使用者的資料版本號
+  (recipe/cache.py)，標籤 / 食材有變更時自然不會再讀到舊結果
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models.functions import Length
+
+from .cache import get_user_version
+
+_trigram_available = None
+
+
+def trigram_available():
+    """資料庫是否已安裝 pg_trgm (每個 process 查詢一次)"""
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available = cursor.fetchone() is not None
+    return _trigram_available
+
+
+class LRUCache:
+    """執行緒安全的簡易 LRU"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_lru = LRUCache(settings.AUTOCOMPLETE_LRU_SIZE)
+
+
+def clear_cache():
+    _lru.clear()
+
+
+def _query(model, user_id, text, limit):
+    queryset = model.objects.filter(user_id=user_id)
+    matches = list(
+        queryset.filter(name__istartswith=text)
+        .order_by(Length('name'), 'name')
+        .values('id', 'name')[:limit]
+    )
+    if len(matches) < limit and trigram_available():
+        found = [match['id'] for match in matches]
+        matches += list(
+            queryset.filter(name__trigram_word_similar=text)
+            .exclude(id__in=found)
+            .annotate(similarity=TrigramWordSimilarity(text, 'name'))
+            .order_by('-similarity', 'name')
+            .values('id', 'name')[:limit - len(matches)]
+        )
+    return matches
+
+
+def autocomplete(model, user_id, text, limit):
+    """
+    input: Tag / Ingredient, 使用者 id, 輸入的文字, 最多回傳筆數
+    result: [{'id': int, 'name': str}, ...]
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    version = get_user_version(user_id)
+    if version is None:  # 沒有共用快取，無法得知資料是否變更
+        return _query(model, user_id, text, limit)
+    key = (model._meta.label, user_id, version, text.lower(), limit)
+    matches = _lru.get(key)
+    if matches is None:
+        matches = _query(model, user_id, text, limit)
+        _lru.set(key, matches)
+    return matches
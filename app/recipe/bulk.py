@@ -0,0 +1,134 @@
+"""
+食譜批次匯入 / 匯出
+- 匯入：整批驗證後，以 bulk_create 在同一個 transaction 內寫入食譜、標籤、食材與多對多關聯
+- 匯出：以 server-side cursor 分段讀取，一筆一行輸出 NDJSON
+"""
+from django.db import transaction
+
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+from .cache import schedule_version_bump
+from .counts import refresh_recipe_counts
+from .search import update_search_vectors
+from .summaries import summarize
+
+BATCH_SIZE = 500  # 每次 INSERT / 讀取的筆數
+STREAM_BUFFER_SIZE = 64 * 1024  # 串流輸出時每次送出的大小 (bytes)
+
+
+def get_or_create_by_names(model, user, names):
+    """
+    批次取得或建立同一使用者的 Tag / Ingredient
+    一次查詢既有名稱 -> 一次 bulk_create 缺少的 -> 再查一次取回主鍵
+    同時建立同名資料時的安全性依賴 (user, name) 唯一限制
+    (unique_tag_name_per_user / unique_ingredient_name_per_user, 0009)：
+    ignore_conflicts 讓較晚的 INSERT 略過而不是報錯，重新查詢時所有請求拿到
+    同一列；沒有這個限制時會各自新增一列，依 id 取最早的一筆也只能讓同一個
+    請求內的結果一致，無法避免重複資料
+    input: 模型, 使用者, 名稱 (可重複)
+    result: {name: obj}
+    """
+    names = list(dict.fromkeys(names))  # 去重並保留順序
+    if not names:
+        return {}
+
+    objs = {}
+    for obj in model.objects.filter(
+            user=user, name__in=names).order_by('id'):
+        objs.setdefault(obj.name, obj)
+
+    missing = [name for name in names if name not in objs]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        for obj in model.objects.filter(
+                user=user, name__in=missing).order_by('id'):
+            objs.setdefault(obj.name, obj)
+
+    return objs
+
+
+@transaction.atomic
+def bulk_create_recipes(user, items):
+    """
+    批次建立食譜
+    input: 使用者, 已通過序列化器驗證的食譜資料 (list of dict)
+    result: 建立的 Recipe 物件 (順序與輸入相同)
+    """
+    recipes = []
+    tag_names = []
+    ingredient_names = []
+    for data in items:
+        data = dict(data)
+        tags = [tag['name'] for tag in data.pop('tags', [])]
+        ingredients = [item['name'] for item in data.pop('ingredients', [])]
+        recipes.append(Recipe(user=user, **data))
+        tag_names.append(tags)
+        ingredient_names.append(ingredients)
+
+    tag_objs = _resolve_names(Tag, user, tag_names)
+    ingredient_objs = _resolve_names(Ingredient, user, ingredient_names)
+    # summary 欄位隨食譜一起 INSERT，不需事後再 UPDATE
+    for recipe, tags, ingredients in zip(recipes, tag_objs, ingredient_objs):
+        recipe.tags_summary = summarize(tags)
+        recipe.ingredients_summary = summarize(ingredients)
+
+    Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+
+    _bulk_link(Recipe.tags.through, 'tag_id', recipes, tag_objs)
+    _bulk_link(Recipe.ingredients.through, 'ingredient_id', recipes,
+               ingredient_objs)
+
+    # bulk_create 不觸發 signal，自行更新使用次數、搜尋欄位並讓快取失效
+    for model, objs_per_recipe in ((Tag, tag_objs),
+                                   (Ingredient, ingredient_objs)):
+        refresh_recipe_counts(
+            model, {obj.id for objs in objs_per_recipe for obj in objs})
+    update_search_vectors([recipe.id for recipe in recipes])
+    schedule_version_bump(user.pk)
+    return recipes
+
+
+def _resolve_names(model, user, names_per_recipe):
+    """一次解析所有名稱，回傳每筆食譜去重後的物件 list"""
+    objs = get_or_create_by_names(
+        model, user, [name for names in names_per_recipe for name in names])
+    return [
+        list({objs[name].id: objs[name] for name in names}.values())
+        for names in names_per_recipe
+    ]
+
+
+def _bulk_link(through, target_column, recipes, objs_per_recipe):
+    """批次寫入多對多關聯"""
+    rows = [
+        through(recipe_id=recipe.id, **{target_column: obj.id})
+        for recipe, objs in zip(recipes, objs_per_recipe)
+        for obj in objs
+    ]
+    through.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+def iter_recipes_ndjson(queryset, serializer):
+    """
+    逐筆序列化食譜並輸出 NDJSON，給 StreamingHttpResponse 使用
+    iterator(chunk_size) 在 Postgres 上使用 server-side cursor，
+    記憶體只保留一個 chunk 的資料 (prefetch 也是以 chunk 為單位)；
+    輸出累積到 STREAM_BUFFER_SIZE 才送出一次，避免每筆都寫一次 socket
+    """
+    renderer = FastJSONRenderer()
+    buffer = []
+    size = 0
+    for recipe in queryset.iterator(chunk_size=BATCH_SIZE):
+        line = renderer.render(serializer.to_representation(recipe)) + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
@@ -0,0 +1,259 @@
+"""
+食譜 / 標籤 / 食材回應快取
+- 以使用者為單位的版本號組成快取 key；任何寫入 (見 signals.py) 提交後把版本號 +1，
+  舊的 key 就不會再被讀到，不需要逐一刪除
+- 快取後端由 settings.CACHES 決定 (測試用 locmem，正式環境可用 Redis / memcached)；
+  版本號必須存在所有 worker 共用的快取，沒有共用快取時 (DummyCache) 不快取回應
+- 版本號也作為 ETag 的依據，Last-Modified 為最後寫入的時間 (條件式 GET)
+- 命中 / 未命中次數累計在共用快取 (所有 worker 合計)，以 cache_stats 指令查看
+"""
+import hashlib
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+KEY_PREFIX = 'recipe-api'
+STATS_KEYS = {
+    'hits': f'{KEY_PREFIX}:stats:hits',
+    'misses': f'{KEY_PREFIX}:stats:misses',
+}
+
+
+def get_cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'{KEY_PREFIX}:user:{user_id}:version'
+
+
+def _modified_key(user_id):
+    return f'{KEY_PREFIX}:user:{user_id}:modified'
+
+
+def _new_version():
+    """
+    版本號不存在 (第一次使用或被快取淘汰) 時以隨機數起算，之後每次寫入 +1；
+    被淘汰前發出的版本號 (快取 key / ETag) 不會再次出現
+    """
+    return secrets.randbits(60)
+
+
+def get_user_state(user_id):
+    """
+    取得使用者目前的資料版本號與最後寫入時間 (一次快取存取)
+    最後寫入時間與寫入時的版本號存在同一個 entry ((version, 秒))，版本號不符
+    (被淘汰或另一個 worker 尚未寫入) 時以目前時間補上：不晚於現在，也不早於
+    任何已提交的寫入
+    result: (version, modified) ; modified 為 unix timestamp (秒)
+            快取無法保存版本號 (DummyCache) 時為 (None, None)
+    """
+    cache = get_cache()
+    keys = (_version_key(user_id), _modified_key(user_id))
+    values = cache.get_many(keys)
+    version = values.get(keys[0])
+    if version is None:
+        cache.add(keys[0], _new_version(), timeout=None)
+        version = cache.get(keys[0])
+        if version is None:
+            return None, None
+    modified = values.get(keys[1])
+    if modified is None or modified[0] != version:
+        modified = (version, int(time.time()))
+        cache.set(keys[1], modified, timeout=None)
+    return version, modified[1]
+
+
+def get_user_version(user_id):
+    """取得使用者目前的資料版本號 (沒有共用快取時為 None)"""
+    return get_user_state(user_id)[0]
+
+
+def bump_user_version(user_id):
+    """
+    使用者的食譜 / 標籤 / 食材有變更時呼叫，讓該使用者所有快取失效
+    版本號以 incr +1，多個 worker 同時寫入也不會遺失；並記錄寫入的時間 (秒)
+    """
+    cache = get_cache()
+    key = _version_key(user_id)
+    try:
+        version = cache.incr(key)
+    except ValueError:  # key 不存在 (被淘汰)
+        version = _new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.incr(key)  # 同時被其他 worker 重新建立
+    cache.set(_modified_key(user_id), (version, int(time.time())),
+              timeout=None)
+
+
+def schedule_version_bump(user_id):
+    """
+    寫入的 transaction 提交後才讓快取失效 (不在 transaction 內時立即執行)
+    提交前就 +1 的話，同時進行的讀取仍讀到舊資料，會存進新版本號的快取，
+    直到下一次寫入前都回傳已不存在的資料 (包含 304)
+    同一個 transaction 內的多次呼叫 (post_save、各個 m2m 變更、搜尋更新)
+    合併為一次 +1
+    """
+    pending = _pending_writes()
+    pending.users.add(user_id)
+    transaction.on_commit(pending)
+
+
+class _PendingWrites:
+    """
+    同一個 transaction 內排程、提交後才執行的工作
+    tasks: {func: 參數集合}，每個 func 以合併後的參數只呼叫一次
+    users: 之後每個使用者的版本號只 +1 一次
+    每次排程都註冊同一個物件為 on_commit callback (savepoint 回滾時
+    Django 會移除該層註冊的 callback)；第一個執行的 callback 做完所有工作，
+    其餘的沒有工作可做
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.users = set()
+
+    def __call__(self):
+        tasks, users = self.tasks, self.users
+        self.tasks, self.users = {}, set()
+        for func, items in tasks.items():
+            func(items)
+        for user_id in users:
+            bump_user_version(user_id)
+
+
+def _pending_writes():
+    """目前 transaction 的 _PendingWrites (不在 transaction 內時為新的物件)"""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return _PendingWrites()
+    pending = getattr(connection, '_recipe_pending_writes', None)
+    # transaction 回滾後 callback 已被清除，不沿用上一個 transaction 的工作
+    if pending is None or not any(
+            entry[1] is pending for entry in connection.run_on_commit):
+        pending = connection._recipe_pending_writes = _PendingWrites()
+    return pending
+
+
+def schedule_task_with_bump(user_id, task, items):
+    """
+    transaction 提交後以 items 呼叫 task，再讓使用者的快取失效
+    同一個 transaction 內的多次排程合併，task 只以所有 items 的聯集呼叫一次
+    """
+    pending = _pending_writes()
+    pending.tasks.setdefault(task, set()).update(items)
+    pending.users.add(user_id)
+    transaction.on_commit(pending)
+
+
+def _incr_stat(name):
+    cache = get_cache()
+    try:
+        cache.incr(STATS_KEYS[name])
+    except ValueError:
+        cache.add(STATS_KEYS[name], 1, timeout=None)
+
+
+def get_cache_stats():
+    """回傳快取命中 / 未命中次數 {'hits': int, 'misses': int}"""
+    values = get_cache().get_many(STATS_KEYS.values())
+    return {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def reset_cache_stats():
+    """命中 / 未命中次數歸零"""
+    get_cache().delete_many(STATS_KEYS.values())
+
+
+def _url_digest(request):
+    """
+    完整網址 (含 tags / ingredients / assigned_only / cursor 等查詢參數；
+    分頁連結含主機名稱，所以連同主機一起算) 與回應格式的雜湊
+    """
+    value = f'{request.build_absolute_uri()}|{request.accepted_media_type}'
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def response_cache_key(request, view_name, version):
+    """快取 key：使用者 + 版本號 + view + 網址雜湊"""
+    return (f'{KEY_PREFIX}:user:{request.user.pk}:{version}:'
+            f'{view_name}:{_url_digest(request)}')
+
+
+def response_etag(request, version):
+    """ETag：使用者版本號 + 網址雜湊，資料有變更時版本號就會不同"""
+    return quote_etag(f'{version}-{_url_digest(request)[:16]}')
+
+
+class CachedListMixin:
+    """
+    快取 list 的回應資料 (序列化後的 data，而非渲染後的 bytes，
+    所以不同格式 (JSON / Browsable API) 可共用同一份快取)
+    - 回應帶有 ETag / Last-Modified；If-None-Match / If-Modified-Since 符合時
+      直接回傳 304，不查詢食譜資料也不執行序列化器
+    - 回應標頭 X-Cache 標示 HIT / MISS
+    只定義 list：沒有 RetrieveModelMixin 的 viewset (標籤 / 食材) 混入後
+    router 不會多出 GET 單筆的路由
+    """
+    cached_actions = ('list',)
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.cached_actions:
+            return handler(request, *args, **kwargs)
+
+        version, modified = get_user_state(request.user.pk)
+        if version is None:
+            # 沒有共用的版本號就無法判斷其他 worker 是否寫入過，不快取也不回傳 304
+            return handler(request, *args, **kwargs)
+        etag = response_etag(request, version)
+        if modified >= int(time.time()):
+            # 同一秒內之後的寫入 Last-Modified 相同，If-Modified-Since 無法分辨，
+            # 這一秒內只提供 ETag
+            modified = None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified)
+        if response is None:
+            response = self._lookup_response(
+                handler, request, version, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if modified is not None:
+                response['Last-Modified'] = http_date(modified)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def _lookup_response(self, handler, request, version, *args, **kwargs):
+        cache = get_cache()
+        key = response_cache_key(request, self.basename, version)
+        data = cache.get(key)
+        if data is not None:
+            _incr_stat('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _incr_stat('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedResponseMixin(CachedListMixin):
+    """快取 list / retrieve 的回應資料 (須搭配 RetrieveModelMixin)"""
+    cached_actions = ('list', 'retrieve')
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,90 @@
+"""
+標籤 / 食材的使用次數 (使用它的食譜數)
+- 預設在列表查詢時以相關子查詢計數：與分頁一起在同一個查詢完成，
+  不需 JOIN + GROUP BY + DISTINCT，也不需每個標籤各查一次
+- 標籤很多的帳號可設 RECIPE_ATTR_COUNTER_COLUMN=1 改讀 recipe_count 欄位；
+  欄位在關聯變更、食譜刪除時 (signals.py) 於同一個 transaction 內重新計算；
+  先鎖定標籤 / 食材資料列再以新的查詢計數，同時寫入的 transaction 依序執行，
+  後執行的會看到先提交的關聯 (READ COMMITTED 下 UPDATE 等待鎖定後只重新檢查
+  WHERE，子查詢仍用舊的快照，直接 UPDATE 會少算)
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Count, Exists, F, OuterRef, Subquery, Value
+)
+from django.db.models.functions import Coalesce
+
+from core.models import Recipe, Tag, Ingredient
+
+RELATED_FIELDS = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}  # Tag / Ingredient -> Recipe 上的多對多欄位
+
+
+def _links(model):
+    """model 對應的多對多關聯表 queryset 與指向 model 的欄位名稱"""
+    field = Recipe._meta.get_field(RELATED_FIELDS[model])
+    through = field.remote_field.through
+    return through.objects.all(), field.m2m_reverse_field_name()
+
+
+def count_expression(model):
+    """使用某個標籤 / 食材的食譜數 (相關子查詢，沒有則為 0)"""
+    links, target = _links(model)
+    return Coalesce(
+        Subquery(
+            links.filter(**{target: OuterRef('pk')})
+            .values(target)
+            .annotate(count=Count('*'))
+            .values('count')
+        ),
+        Value(0),
+    )
+
+
+def annotate_recipe_counts(queryset):
+    """加上 num_recipes：即時計數或讀 recipe_count 欄位 (依設定)"""
+    if settings.RECIPE_ATTR_COUNTER_COLUMN:
+        return queryset.annotate(num_recipes=F('recipe_count'))
+    return queryset.annotate(num_recipes=count_expression(queryset.model))
+
+
+def filter_assigned(queryset):
+    """只保留有食譜使用的標籤 / 食材 (EXISTS，不 JOIN 所以不需 DISTINCT)"""
+    if settings.RECIPE_ATTR_COUNTER_COLUMN:
+        return queryset.filter(recipe_count__gt=0)
+    links, target = _links(queryset.model)
+    return queryset.filter(
+        Exists(links.filter(**{target: OuterRef('pk')})))
+
+
+def refresh_recipe_counts(model, ids):
+    """
+    鎖定指定標籤 / 食材後重新計算 recipe_count (依 id 順序鎖定，避免互相等待；
+    FOR NO KEY UPDATE 不會擋住其他 transaction 新增指向它的關聯)
+    input: Tag / Ingredient, id 的 list
+    """
+    if not ids:
+        return
+    with transaction.atomic(savepoint=False):
+        locked = list(
+            model.objects.select_for_update(no_key=True).filter(id__in=ids)
+            .order_by('id').values_list('id', flat=True))
+        model.objects.filter(id__in=locked).update(
+            recipe_count=count_expression(model))
+
+
+def find_stale_counts(queryset):
+    """
+    比對 recipe_count 與關聯表的實際數量
+    input: Tag / Ingredient queryset
+    result: 不一致的 id queryset
+    """
+    return (
+        queryset
+        .annotate(expected_count=count_expression(queryset.model))
+        .exclude(recipe_count=F('expected_count'))
+        .values_list('id', flat=True)
+    )
@@ -0,0 +1,141 @@
+"""
+唯讀食譜列表的快速輸出
+- 以 .values() 取回 dict，依序列化器欄位事先建好每個欄位的轉換函式，
+  每筆資料不建立模型實例、不經過序列化器欄位的 get_attribute / SkipField 流程
+- 標籤 / 食材直接讀 summary 欄位 (recipe/summaries.py)，不需另外查詢多對多資料表
+- 輸出與序列化器完全相同 (見 tests/test_fastpath.py)；序列化器含有不支援的欄位時
+  for_serializer 回傳 None，由呼叫端改用一般的序列化器
+"""
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.models import Recipe
+from .serializers import ImageVariantsField, SummaryListSerializer
+
+# 值由資料庫取回時已是輸出型別，to_representation 等同原值
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+
+class RowRenderer:
+    """依序列化器欄位將 .values() 的 dict 轉為輸出的 dict"""
+
+    def __init__(self, columns, converters):
+        self.columns = columns  # .values() 要取的欄位
+        self.converters = converters  # [(輸出名稱, 轉換函式(row))]
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """
+        input: 序列化器實例 (已套用 ?fields= / ?exclude=)
+        result: RowRenderer，有不支援的欄位時回傳 None
+        """
+        model = serializer.Meta.model
+        columns = {'id'}  # 游標分頁以 id 定位
+        converters = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            converter = _converter(model, field, columns)
+            if converter is None:
+                return None
+            converters.append((name, converter))
+        return cls(sorted(columns), converters)
+
+    def render(self, rows):
+        converters = self.converters
+        return [
+            {name: convert(row) for name, convert in converters}
+            for row in rows
+        ]
+
+
+def _converter(model, field, columns):
+    """建立單一欄位的轉換函式，並把需要的欄位加入 columns"""
+    if isinstance(field, SummaryListSerializer):
+        # 由 JSON 解碼的新物件，內容即為輸出格式，不需再複製
+        columns.add(field.summary_field)
+        return itemgetter(field.summary_field)
+
+    if isinstance(field, ImageVariantsField):
+        columns.update(field.model_columns)
+        return _image_variants(field)
+
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete or model_field.is_relation:
+        return None
+
+    column = model_field.attname
+    columns.add(column)
+    get = itemgetter(column)
+    if type(field) in PASSTHROUGH_FIELDS:
+        return get
+    if not model_field.null and _is_fixed_decimal(field, model_field):
+        return lambda row: format(get(row), 'f')
+    return _nullable(field, get)
+
+
+def _is_fixed_decimal(field, model_field):
+    """
+    numeric(max_digits, decimal_places) 欄位取回的值小數位數固定，
+    DecimalField 的 quantize 不會改變值，直接格式化即可
+    """
+    return (
+        type(field) is serializers.DecimalField and
+        getattr(field, 'coerce_to_string',
+                api_settings.COERCE_DECIMAL_TO_STRING) and
+        not field.localize and
+        not field.normalize_output and
+        field.decimal_places == getattr(model_field, 'decimal_places', None)
+    )
+
+
+def _nullable(field, get):
+    """與 Serializer.to_representation 相同：None 直接輸出 null"""
+    to_representation = field.to_representation
+
+    def convert(row):
+        value = get(row)
+        return None if value is None else to_representation(value)
+    return convert
+
+
+def _image_variants(field):
+    """ImageVariantsField 需要 FieldFile 才能組出縮圖網址"""
+    image_field = Recipe._meta.get_field('image')
+    attr_class = image_field.attr_class
+    to_representation = field.to_representation
+
+    def convert(row):
+        if row['image_status'] != Recipe.ImageStatus.READY:
+            return None
+        return to_representation(attr_class(None, image_field, row['image']))
+    return convert
+
+
+class FastListMixin:
+    """
+    list 改以 RowRenderer 輸出 (須放在 CachedResponseMixin 之後，快取的仍是
+    輸出的資料)；fast_list = False 或序列化器不支援時使用原本的序列化器
+    """
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        renderer = None
+        if self.fast_list:
+            renderer = RowRenderer.for_serializer(self.get_serializer())
+        if renderer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values(*renderer.columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(renderer.render(page))
+        return Response(renderer.render(rows))
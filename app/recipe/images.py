@@ -0,0 +1,117 @@
+"""
+食譜圖片處理
+上傳的原圖只用 Pillow 解碼一次，依 VARIANTS 產生數個縮小版 (WebP，不含 EXIF 等
+metadata)，存在原圖旁邊：
+    uploads/recipe/<sha256>.jpg
+    uploads/recipe/<sha256>_thumbnail.webp
+    uploads/recipe/<sha256>_medium.webp
+列表只需要縮圖，不必下載數 MB 的原圖
+原圖以內容雜湊命名 (core/storage.py)，縮圖名稱也隨之固定，多個食譜可共用
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from core.models import Recipe
+from core.storage import get_image_storage, lock_content
+
+# 名稱 -> 最大寬高 (等比例縮小，不放大)；由大到小排列，小圖由上一張縮小而來
+VARIANTS = {
+    'medium': (1024, 1024),
+    'thumbnail': (320, 320),
+}
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = '.webp'
+VARIANT_QUALITY = 80
+
+
+def variant_name(name, variant):
+    """原圖路徑 -> 縮圖路徑 (同一目錄)"""
+    root = os.path.splitext(name)[0]
+    return f'{root}_{variant}{VARIANT_EXTENSION}'
+
+
+def variant_urls(image):
+    """
+    各尺寸的網址 (只組路徑，不存取檔案)
+    input: ImageField 的值 (FieldFile)
+    result: {'thumbnail': url, 'medium': url}；沒有圖片時回傳 None
+    """
+    if not image:
+        return None
+    return {
+        variant: image.storage.url(variant_name(image.name, variant))
+        for variant in VARIANTS
+    }
+
+
+def _open(image):
+    """解碼原圖並依 EXIF 轉正；JPEG 直接以最大尺寸的縮小比例解碼"""
+    image.open('rb')
+    try:
+        img = Image.open(image)
+        img.draft('RGB', max(VARIANTS.values()))
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    finally:
+        image.close()
+
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+    return img
+
+
+def _encode(img):
+    buffer = BytesIO()
+    # 不傳 exif / icc_profile，輸出不含原圖的 metadata
+    img.save(buffer, format=VARIANT_FORMAT, quality=VARIANT_QUALITY,
+             method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(image):
+    """
+    產生所有尺寸的縮圖並存到原圖旁邊
+    原圖為內容定址 (core/storage.py)，縮圖已存在代表是同一張圖片，不需重新產生
+    input: ImageField 的值 (FieldFile)
+    result: {variant: 儲存路徑}
+    """
+    storage = image.storage
+    names = {
+        variant: variant_name(image.name, variant) for variant in VARIANTS}
+    if all(storage.exists(name) for name in names.values()):
+        return names
+
+    img = _open(image)
+    for variant, size in VARIANTS.items():
+        img.thumbnail(size, Image.Resampling.LANCZOS)
+        storage.save_derived(names[variant], _encode(img))
+    return names
+
+
+def delete_variants(name):
+    """刪除某張原圖 (儲存路徑) 的所有縮圖"""
+    if not name:
+        return
+    storage = get_image_storage()
+    for variant in VARIANTS:
+        storage.delete(variant_name(name, variant))
+
+
+def release_image(name):
+    """
+    食譜不再使用某張圖片時呼叫 (刪除食譜或換圖)
+    內容定址的檔案可能被其他食譜共用，沒有任何食譜參照時才刪除原圖與縮圖；
+    持有 lock_content 檢查與刪除，同時上傳相同內容的請求會等到刪除完成後重新寫入
+    """
+    if not name:
+        return
+    with transaction.atomic():
+        lock_content(name)
+        if Recipe.objects.filter(image=name).exists():
+            return
+        get_image_storage().delete(name)
+        delete_variants(name)
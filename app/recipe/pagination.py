@@ -0,0 +1,27 @@
+"""
+食譜 / 標籤 / 食材列表的游標分頁
+以既有的排序欄位作為 keyset，不論翻到第幾頁查詢成本都相同 (不使用 OFFSET / COUNT)
+全文搜尋依相關程度 (浮點數) 排序，無法當作游標，改用頁碼分頁
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """食譜列表分頁，依 -id 排序"""
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'  # 客戶端可自訂每頁筆數
+    max_page_size = 100  # 伺服器端上限
+    ordering = '-id'
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """標籤與食材列表分頁，依 -name 排序，同名時以 -id 確保順序穩定"""
+    ordering = ('-name', '-id')
+
+
+class RecipeSearchPagination(PageNumberPagination):
+    """?q= 搜尋結果分頁，依相關程度排序"""
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
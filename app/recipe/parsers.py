@@ -0,0 +1,50 @@
+"""食譜 API 使用的額外解析器"""
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from core.parsers import orjson
+
+
+def _stdlib_loads(line, encoding):
+    return json.loads(line.decode(encoding))
+
+
+def _orjson_loads(line, encoding):
+    """orjson 直接解析 bytes；無法解析的行交給 stdlib (同 core/parsers.py)"""
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return _stdlib_loads(line, encoding)
+
+
+class NDJSONParser(BaseParser):
+    """
+    解析 NDJSON (每行一個 JSON 物件)，回傳 list
+    讓同步客戶端可以一行一筆地上傳大量食譜
+    有安裝 orjson 且為 UTF-8 時以 orjson 解析每一行
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            loads = _stdlib_loads
+        else:
+            loads = _orjson_loads
+
+        items = []
+        for lineno, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue  # 允許空行
+            try:
+                items.append(loads(line, encoding))
+            except ValueError as exc:
+                raise ParseError(
+                    f'NDJSON parse error on line {lineno} - {exc}')
+        return items
@@ -0,0 +1,99 @@
+"""
+食譜查詢規劃
+- 依序列化器實際會輸出的欄位決定要載入哪些欄位、預先載入哪些關聯，避免 N+1 查詢
+- 標籤 / 食材過濾以子查詢 (EXISTS / 分組計數) 實作，不 JOIN 多對多資料表，
+  因此不需要 DISTINCT
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Exists, OuterRef, Prefetch
+from rest_framework import serializers
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+
+def plan_recipe_queryset(queryset, serializer):
+    """
+    依序列化器輸出的欄位規劃查詢
+    - 一般欄位：只 SELECT 序列化器會用到的欄位 (only)
+    - 巢狀多對多欄位：一次 prefetch，且只取子序列化器的欄位
+    - 宣告 model_columns 的欄位 (例如讀 summary 的 tags / ingredients)：
+      只 SELECT 其列出的欄位，不 prefetch
+    input: Recipe queryset, 序列化器實例
+    result: 已套用 only() 與 prefetch_related() 的 queryset
+    """
+    model = queryset.model
+    columns = {'id'}
+    prefetches = []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        if hasattr(field, 'model_columns'):
+            # 欄位自行宣告輸出時需要的欄位 (例如 summary 欄位、圖片與處理狀態)
+            columns.update(field.model_columns)
+            continue
+        model_field = _get_model_field(model, field.source)
+        if model_field is None:
+            continue
+
+        if model_field.many_to_many:
+            related_model = model_field.related_model
+            prefetches.append(Prefetch(
+                field.source,
+                queryset=related_model.objects.only(
+                    *_related_columns(related_model, field)),
+            ))
+        elif model_field.concrete:
+            columns.add(model_field.attname)
+
+    return queryset.only(*sorted(columns)).prefetch_related(*prefetches)
+
+
+def _get_model_field(model, name):
+    """取得模型欄位，非模型欄位 (例如計算欄位) 回傳 None"""
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _related_columns(related_model, field):
+    """巢狀序列化器 (many=True) 需要的關聯模型欄位"""
+    child = field.child if isinstance(
+        field, serializers.ListSerializer) else field
+    columns = {'id'}
+    for child_field in getattr(child, 'fields', {}).values():
+        model_field = _get_model_field(related_model, child_field.source)
+        if model_field is not None and model_field.concrete:
+            columns.add(model_field.attname)
+    return sorted(columns)
+
+
+def filter_by_related(queryset, field_name, ids, match=MATCH_ANY):
+    """
+    依多對多關聯 (tags / ingredients) 過濾食譜
+    - any：有其中任一個 -> WHERE EXISTS (SELECT 1 FROM 關聯表 ...)
+    - all：全部都有 -> WHERE id IN (依食譜分組、計數等於 ids 數量的子查詢)
+    input: Recipe queryset, 多對多欄位名稱, 關聯物件 id list, 比對模式
+    result: 過濾後的 queryset (不含 JOIN，不會產生重複資料)
+    """
+    ids = set(ids)
+    field = queryset.model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()  # 例如 recipe
+    target = field.m2m_reverse_field_name()  # 例如 tag
+    links = through.objects.filter(**{f'{target}_id__in': ids})
+
+    if match == MATCH_ALL:
+        # 關聯表的 (recipe_id, tag_id) 唯一，計數等於 ids 數量即全部都有
+        matched = (
+            links.values(f'{source}_id')
+            .annotate(matched=Count(f'{target}_id'))
+            .filter(matched=len(ids))
+            .values(f'{source}_id')
+        )
+        return queryset.filter(id__in=matched)
+
+    return queryset.filter(Exists(links.filter(**{source: OuterRef('pk')})))
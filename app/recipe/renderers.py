@@ -0,0 +1,22 @@
+"""食譜 API 使用的額外渲染器"""
+from rest_framework.renderers import BaseRenderer
+
+from core.renderers import FastJSONRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    NDJSON (每行一個 JSON 物件)
+    列表以 StreamingHttpResponse 逐筆輸出 (見 RecipeViewSet.list)，
+    這裡只處理非串流的回應 (例如錯誤訊息)
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        renderer = FastJSONRenderer()
+        return b''.join(renderer.render(item) + b'\n' for item in items)
@@ -0,0 +1,88 @@
+"""
+食譜全文搜尋 (Postgres)
+- Recipe.search_vector 儲存 title (A) / description (B) / 標籤與食材名稱 (C)
+  的 tsvector，以 GIN 索引查詢
+- 食譜、標籤、食材或其關聯變更時 (signals.py)，在 transaction 提交後以一個
+  UPDATE 重新計算同一個 transaction 內所有受影響食譜的 search_vector
+- ?q= 使用 websearch 語法 ("a b" / a OR b / -a)，依 SearchRank 排序
+"""
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector
+)
+from django.db.models import F, OuterRef, Subquery
+
+from core.models import Recipe, Tag, Ingredient
+from .cache import schedule_task_with_bump
+
+
+def _names_subquery(model):
+    """某食譜所有標籤 / 食材名稱以空白串接 (相關子查詢)"""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef('pk'))
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def search_vector_expression():
+    config = settings.RECIPE_SEARCH_CONFIG
+    return (
+        SearchVector('title', weight='A', config=config) +
+        SearchVector('description', weight='B', config=config) +
+        SearchVector(_names_subquery(Tag), weight='C', config=config) +
+        SearchVector(_names_subquery(Ingredient), weight='C', config=config)
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """
+    重新計算指定食譜的 search_vector (一個 UPDATE)
+    input: 食譜 id 的 list，或 values_list('id') 的 queryset (成為子查詢)
+    """
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        search_vector=search_vector_expression())
+
+
+def find_stale_search_vectors(queryset):
+    """
+    比對儲存的 search_vector 與由食譜、標籤、食材計算的結果
+    (提交後的更新失敗時會留下舊的內容，由 rebuild_recipe_summaries 修復)
+    input: Recipe queryset
+    result: 不一致 (含尚未計算) 的食譜 id queryset
+    """
+    return (
+        queryset
+        .annotate(expected_search_vector=search_vector_expression())
+        .exclude(search_vector=F('expected_search_vector'))
+        .values_list('id', flat=True)
+    )
+
+
+def schedule_search_update(user_id, recipe_ids):
+    """
+    transaction 提交後才更新 (同一個請求內的多次變更不會各自重算到一半的資料)，
+    更新後再讓使用者的回應快取失效，避免快取到更新前的搜尋結果
+    同一個 transaction 內的多次呼叫 (食譜本身、標籤、食材關聯) 合併為
+    一個 UPDATE 與一次快取失效
+    input: 使用者 id, 食譜 id 的 iterable (queryset 在此時取值)
+    """
+    schedule_task_with_bump(user_id, update_search_vectors, recipe_ids)
+
+
+def search_recipes(queryset, text):
+    """
+    全文搜尋並依相關程度排序
+    input: Recipe queryset, 搜尋字串
+    result: 加上 rank 並依 rank 排序的 queryset
+    """
+    query = SearchQuery(
+        text, search_type='websearch', config=settings.RECIPE_SEARCH_CONFIG)
+    return (
+        queryset
+        .filter(search_vector=query)
+        .annotate(rank=SearchRank(F('search_vector'), query))
+        .order_by('-rank', '-id')
+    )
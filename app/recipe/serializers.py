@@ -1,26 +1,146 @@
 """將  食譜 材料 標籤 進行序列化"""
+from django.db import transaction
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from core.models import Recipe, Tag, Ingredient
-
-
-class TagSerializer(serializers.ModelSerializer):
+from .bulk import get_or_create_by_names
+from .images import VARIANTS, release_image, variant_urls
+from .uploads import HeaderOnlyImageField
+
+
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Tag / Ingredient 共用：同一使用者下名稱不可重複"""
+
+    def validate_name(self, value):
+        """直接建立或更新時檢查名稱是否已存在 (巢狀在食譜中時會沿用既有的)"""
+        if self.parent is not None:
+            return value
+        queryset = self.Meta.model.objects.filter(
+            user=self.context['request'].user, name=value)
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError('此名稱已存在')
+        return value
+
+
+@extend_schema_field({
+    'type': 'object',
+    'nullable': True,
+    'properties': {
+        variant: {'type': 'string', 'format': 'uri'} for variant in VARIANTS
+    },
+})
+class ImageVariantsField(serializers.Field):
+    """
+    唯讀：圖片各尺寸縮圖的網址 {'thumbnail': url, 'medium': url}
+    背景處理完成 (image_status = ready) 前輸出 null
+    source 為 image 欄位，查詢規劃 (queries.py) 只載入 model_columns 列出的欄位
+    """
+    model_columns = ('image', 'image_status')
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if instance.image_status != Recipe.ImageStatus.READY:
+            return None
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        urls = variant_urls(value)
+        request = self.context.get('request')
+        if urls and request is not None:
+            urls = {
+                variant: request.build_absolute_uri(url)
+                for variant, url in urls.items()
+            }
+        return urls
+
+
+class TagSerializer(RecipeAttrSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
         read_only_fields = ['id']
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttrSerializer):
     class Meta:
         model = Ingredient
         fields = ['id', 'name']
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    tags = TagSerializer(many=True, required=False)
-    ingredients = IngredientSerializer(
-        many=True, required=False)  # 確保正確處理ingredients
+class TagUsageSerializer(TagSerializer):
+    """標籤 API：附上使用中的食譜數 (queryset 須經 counts.annotate_recipe_counts)"""
+    recipe_count = serializers.IntegerField(
+        source='num_recipes', read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+
+class IngredientUsageSerializer(IngredientSerializer):
+    """食材 API：同 TagUsageSerializer"""
+    recipe_count = serializers.IntegerField(
+        source='num_recipes', read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+
+class SummaryListSerializer(serializers.ListSerializer):
+    """
+    巢狀多對多欄位：寫入與一般 many=True 相同，輸出則讀食譜上的反正規化
+    summary 欄位 (recipe/summaries.py)，不需查詢多對多資料表
+    """
+
+    def __init__(self, *args, summary_field, **kwargs):
+        self.summary_field = summary_field
+        super().__init__(*args, **kwargs)
+
+    @property
+    def model_columns(self):
+        return (self.summary_field,)
+
+    def get_attribute(self, instance):
+        return getattr(instance, self.summary_field)
+
+    def to_representation(self, data):
+        return [dict(item) for item in data]  # 已是 [{'id', 'name'}]
+
+
+class DynamicFieldsMixin:
+    """
+    欄位投影：fields=只輸出這些欄位，exclude=不輸出這些欄位
+    查詢規劃 (queries.py) 依剩下的欄位決定 SELECT 的欄位，未輸出的欄位不會載入
+    """
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for param, names in (('fields', fields), ('exclude', exclude)):
+            unknown = set(names or ()) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({
+                    param: f'Unknown field(s): {", ".join(sorted(unknown))}.'
+                })
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude or ():
+            self.fields.pop(name)
+
+
+class RecipeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    tags = SummaryListSerializer(
+        child=TagSerializer(), summary_field='tags_summary', required=False)
+    ingredients = SummaryListSerializer(
+        child=IngredientSerializer(), summary_field='ingredients_summary',
+        required=False)  # 確保正確處理ingredients
+    image_variants = ImageVariantsField()  # 縮圖網址，列表不需下載原圖
 
     class Meta:
         model = Recipe
@@ -31,29 +151,45 @@ class RecipeSerializer(serializers.ModelSerializer):
             'price',
             'link',
             'tags',
-            'ingredients']
+            'ingredients',
+            'image_variants']
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_attrs(self, model, items):
+        """批次取得或建立 tags / ingredients (見 bulk.get_or_create_by_names)"""
+        names = [item['name'] for item in items]
+        objs = get_or_create_by_names(
+            model, self.context['request'].user, names)
+        return [objs[name] for name in dict.fromkeys(names)]
+
+    def _set_attrs(self, recipe, field_name, model, items, replace=False):
+        """
+        將 tags / ingredients 指派給食譜
+        replace=True 時比對新舊集合，只刪除移除的、只新增多出的關聯
+        """
+        manager = getattr(recipe, field_name)
+        new_ids = {obj.id for obj in self._get_or_create_attrs(model, items)}
+
+        if replace:
+            current_ids = set(manager.values_list('id', flat=True))
+            removed_ids = current_ids - new_ids
+            if removed_ids:
+                manager.remove(*removed_ids)
+            new_ids -= current_ids
+
+        if new_ids:
+            manager.add(*new_ids)  # 單次批次寫入多對多關聯
+
+    def _get_or_create_tags(self, tags, recipe, replace=False):
         """獲取或創建 tags"""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
-
-    def _get_or_create_ingredients(self, ingredients, recipe):
+        self._set_attrs(recipe, 'tags', Tag, tags, replace)
+
+    def _get_or_create_ingredients(self, ingredients, recipe, replace=False):
         """獲取或創建 ingredients"""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        self._set_attrs(recipe, 'ingredients', Ingredient, ingredients,
+                        replace)
 
+    @transaction.atomic
     def create(self, validated_data):
         """創建食譜"""
         tags = validated_data.pop('tags', [])
@@ -63,18 +199,18 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """更新食譜"""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._get_or_create_tags(tags, instance, replace=True)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._get_or_create_ingredients(
+                ingredients, instance, replace=True)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -86,13 +222,34 @@ class RecipeSerializer(serializers.ModelSerializer):
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for detailed recipe"""
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description']  # 包含詳細字段
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image_status']  # 包含詳細字段
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + [
+            'image_status']
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
+    image = serializers.ImageField(
+        required=True,
+        _DjangoImageField=HeaderOnlyImageField)  # 只檢查檔頭，不解碼整張圖
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
-        extra_kwargs = {'image': {'required': 'True'}}
+        fields = ['id', 'image', 'image_status', 'image_variants']
+        read_only_fields = ['id', 'image_status']
+
+    def update(self, instance, validated_data):
+        """
+        儲存原圖並排入背景處理佇列 (recipe/tasks.py)
+        在 transaction 內儲存：共用既有檔案時持有的 lock_content 直到參照 commit
+        """
+        previous = instance.image.name
+        validated_data['image_status'] = Recipe.ImageStatus.PENDING
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+        if previous and previous != instance.image.name:
+            # 舊圖片沒有其他食譜使用時才刪除
+            transaction.on_commit(lambda: release_image(previous))
+        return instance
@@ -0,0 +1,153 @@
+"""
+食譜相關模型的 signal 處理
+任何 Recipe / Tag / Ingredient 或其多對多關聯的變更都會讓該使用者的回應快取失效
+刪除食譜時釋放其圖片 (沒有其他食譜共用才刪除檔案)
+影響搜尋內容的變更 (標題、描述、標籤 / 食材名稱與關聯) 排程更新 search_vector
+標籤 / 食材名稱與關聯變更時，立即 (同一個 transaction) 更新食譜的 summary 欄位
+關聯變更與刪除食譜時，同樣立即更新標籤 / 食材的 recipe_count
+(兩者都先鎖定資料列再重新計算，見 summaries.py / counts.py)
+(bulk_create 不會觸發 signal，批次寫入需自行呼叫 schedule_version_bump)
+"""
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingredient
+from .cache import schedule_version_bump
+from .counts import RELATED_FIELDS, refresh_recipe_counts
+from .images import release_image
+from .search import schedule_search_update
+from .summaries import SUMMARY_FIELDS, refresh_summaries
+
+SEARCH_FIELDS = {'title', 'description'}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """新增 / 更新 / 刪除提交後讓擁有者的快取失效"""
+    schedule_version_bump(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_cache_on_m2m(sender, instance, action, **kwargs):
+    """食譜的標籤 / 食材關聯變更提交後讓擁有者的快取失效 (正反向皆同一個使用者)"""
+    if action.startswith('post_'):
+        schedule_version_bump(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    """食譜刪除且 transaction 確定提交後，釋放其圖片"""
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: release_image(name))
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_attrs_before_recipe_delete(sender, instance, **kwargs):
+    """刪除前先取得食譜的標籤 / 食材 (關聯會一併刪除且不觸發 m2m_changed)"""
+    instance._linked_attr_ids = {
+        model: list(getattr(instance, field_name).values_list(
+            'id', flat=True))
+        for model, field_name in RELATED_FIELDS.items()
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def refresh_counts_after_recipe_delete(sender, instance, **kwargs):
+    """食譜刪除後重新計算其標籤 / 食材的 recipe_count"""
+    for model, ids in getattr(instance, '_linked_attr_ids', {}).items():
+        refresh_recipe_counts(model, ids)
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_search(sender, instance, update_fields=None, **kwargs):
+    """標題 / 描述可能變更時更新 search_vector (只更新圖片狀態等欄位時略過)"""
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    schedule_search_update(instance.user_id, [instance.pk])
+
+
+def _linked_recipe_ids(instance):
+    """使用某個標籤 / 食材的食譜 id (子查詢)"""
+    return instance.recipe_set.values_list('id', flat=True)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_attr_recipes(sender, instance, created, **kwargs):
+    """標籤 / 食材改名後更新使用它的食譜"""
+    if not created:
+        linked = _linked_recipe_ids(instance)
+        refresh_summaries(linked, [SUMMARY_FIELDS[sender]])
+        schedule_search_update(instance.user_id, linked)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_recipes_before_attr_delete(sender, instance, **kwargs):
+    """刪除前先取得使用中的食譜 (關聯會一併刪除且不觸發 m2m_changed)"""
+    instance._linked_recipe_ids = list(_linked_recipe_ids(instance))
+    schedule_search_update(instance.user_id, instance._linked_recipe_ids)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_summaries_after_attr_delete(sender, instance, **kwargs):
+    """關聯刪除後重新計算原本使用它的食譜"""
+    refresh_summaries(getattr(instance, '_linked_recipe_ids', []),
+                      [SUMMARY_FIELDS[sender]])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_recipes_on_m2m(sender, instance, action, reverse, model,
+                           pk_set, **kwargs):
+    """
+    關聯變更後更新 summary、search_vector 與 recipe_count
+    正向 (recipe.tags.add) 為該食譜，並同步記憶體中的 summary，讓序列化器
+    create / update 回傳的內容與資料庫一致；反向 (tag.recipe_set.add) 為 pk_set
+    中的食譜；clear 沒有 pk_set，須在 pre_clear 先取得
+    """
+    if action == 'pre_clear':
+        if reverse:
+            instance._linked_recipe_ids = list(_linked_recipe_ids(instance))
+        else:
+            instance._cleared_attr_ids = list(
+                model.objects.filter(recipe=instance)
+                .values_list('id', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+
+    if not reverse:
+        attr_model = model
+        recipe_ids = [instance.pk]
+        if action == 'post_clear':
+            attr_ids = instance.__dict__.pop('_cleared_attr_ids', [])
+        else:
+            attr_ids = list(pk_set)
+    else:
+        attr_model = type(instance)
+        attr_ids = [instance.pk]
+        if action == 'post_clear':
+            recipe_ids = instance.__dict__.pop('_linked_recipe_ids', [])
+        else:
+            recipe_ids = list(pk_set)
+
+    # 先鎖定標籤 / 食材 (重新計數)，同時改名的 transaction 提交後才重新計算
+    # summary，新連結的食譜不會留下舊名稱
+    refresh_recipe_counts(attr_model, attr_ids)
+    field = SUMMARY_FIELDS[attr_model]
+    refresh_summaries(recipe_ids, [field])
+    if not reverse:
+        instance.refresh_from_db(fields=[field])
+    schedule_search_update(instance.user_id, recipe_ids)
@@ -0,0 +1,90 @@
+"""
+食譜標籤 / 食材的反正規化副本 (Recipe.tags_summary / ingredients_summary)
+- 內容為 [{'id': int, 'name': str}, ...]，依 id 排序
+- 列表 / 詳細頁直接讀這兩個欄位，一次掃描食譜資料表即可輸出，不需 JOIN 或
+  prefetch 多對多資料表
+- 關聯、標籤 / 食材名稱變更或刪除時 (signals.py)，在同一個 transaction 內
+  鎖定受影響的食譜後以新的查詢重新計算，與關聯資料同時提交或回滾；
+  同時變更同一食譜的 transaction 依序執行，後執行的會看到先提交的名稱與關聯
+"""
+from django.db import transaction
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.db.models import F, JSONField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, JSONObject
+
+from core.models import Recipe, Tag, Ingredient
+
+SUMMARY_FIELDS = {
+    Tag: 'tags_summary',
+    Ingredient: 'ingredients_summary',
+}
+
+
+def summary_expression(model):
+    """某食譜所有標籤 / 食材的 [{'id', 'name'}] (相關子查詢，沒有則為 [])"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe')
+            .annotate(items=JSONBAgg(
+                JSONObject(id='id', name='name'), ordering='id'))
+            .values('items')
+        ),
+        Value([], output_field=JSONField()),
+    )
+
+
+def summary_expressions(fields=None):
+    expressions = {
+        name: summary_expression(model)
+        for model, name in SUMMARY_FIELDS.items()
+    }
+    if fields is not None:
+        expressions = {name: expressions[name] for name in fields}
+    return expressions
+
+
+def refresh_summaries(recipe_ids, fields=None):
+    """
+    鎖定指定食譜後重新計算 summary 欄位 (依 id 順序鎖定，避免互相等待)
+    直接 UPDATE 的話，等待其他 transaction 釋放鎖定後只會重新檢查 WHERE，
+    子查詢仍用開始時的快照，會寫回已被改名 / 移除的標籤 / 食材
+    input: 食譜 id 的 list，或 values_list('id') 的 queryset (成為子查詢)，
+           要更新的欄位 (預設兩個都更新)
+    """
+    with transaction.atomic(savepoint=False):
+        locked = list(
+            Recipe.objects.select_for_update(no_key=True)
+            .filter(id__in=recipe_ids)
+            .order_by('id').values_list('id', flat=True))
+        if locked:
+            Recipe.objects.filter(id__in=locked).update(
+                **summary_expressions(fields))
+
+
+def summarize(objs):
+    """Tag / Ingredient 物件 -> 與資料庫相同格式的 summary"""
+    return [
+        {'id': obj.id, 'name': obj.name}
+        for obj in sorted(objs, key=lambda obj: obj.id)
+    ]
+
+
+def find_stale_summaries(queryset):
+    """
+    比對儲存的 summary 與由關聯資料表計算的結果
+    input: Recipe queryset
+    result: 不一致的食譜 id queryset
+    """
+    return (
+        queryset
+        .annotate(**{
+            f'expected_{name}': expression
+            for name, expression in summary_expressions().items()
+        })
+        .exclude(
+            tags_summary=F('expected_tags_summary'),
+            ingredients_summary=F('expected_ingredients_summary'),
+        )
+        .values_list('id', flat=True)
+    )
@@ -0,0 +1,123 @@
+"""
+食譜圖片背景處理
+不需要額外的 broker：image_status = pending 的食譜本身就是工作佇列
+- 上傳 API 只儲存原圖並標記 pending，立即回應，不佔用 uWSGI worker 做縮圖
+- 背景 worker (manage.py process_images，由 uWSGI attach-daemon 啟動) 以
+  SELECT ... FOR UPDATE SKIP LOCKED 取出一筆並標記 processing，立即 commit；
+  解碼 / 縮圖期間不持有 row lock，不會擋住同一筆食譜的修改
+- 完成時以條件式 UPDATE 寫回：處理期間換了圖片 (又變回 pending) 就不覆蓋
+- worker 中途結束時食譜停在 processing，超過 IMAGE_PROCESSING_TIMEOUT 秒
+  由 requeue_stale_images 放回佇列，可同時執行多個 worker
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import Recipe
+from .cache import bump_user_version
+from .images import generate_variants, release_image
+
+logger = logging.getLogger(__name__)
+
+
+def claim_next_image():
+    """
+    取出佇列中的一筆並標記 processing (短 transaction，commit 後即釋放 row lock)
+    result: 食譜 (只載入處理需要的欄位)；佇列為空時回傳 None
+    """
+    with transaction.atomic():
+        recipe = (
+            Recipe.objects
+            .select_for_update(skip_locked=True)
+            .filter(image_status=Recipe.ImageStatus.PENDING)
+            .only('id', 'user_id', 'image', 'image_status',
+                  'image_claimed_at')
+            .order_by('id')
+            .first()
+        )
+        if recipe is None:
+            return None
+        recipe.image_status = Recipe.ImageStatus.PROCESSING
+        recipe.image_claimed_at = timezone.now()
+        recipe.save(update_fields=['image_status', 'image_claimed_at'])
+    return recipe
+
+
+def finish_image(recipe, status):
+    """
+    寫回處理結果；只有食譜仍是這次取出的同一張圖片時才更新
+    result: 是否寫入
+    """
+    updated = Recipe.objects.filter(
+        id=recipe.id,
+        image=recipe.image.name,
+        image_status=Recipe.ImageStatus.PROCESSING,
+        image_claimed_at=recipe.image_claimed_at,
+    ).update(image_status=status, image_claimed_at=None)
+    if updated:
+        bump_user_version(recipe.user_id)
+    else:
+        # 處理期間換圖或刪除食譜：剛產生的縮圖可能已沒有食譜使用
+        release_image(recipe.image.name)
+    return bool(updated)
+
+
+def process_next_image():
+    """
+    處理佇列中的一筆圖片
+    result: 處理的食譜 id；佇列為空時回傳 None
+    """
+    recipe = claim_next_image()
+    if recipe is None:
+        return None
+
+    try:
+        generate_variants(recipe.image)
+        status = Recipe.ImageStatus.READY
+    except Exception:
+        logger.exception('Failed to process image of recipe %s', recipe.id)
+        status = Recipe.ImageStatus.FAILED
+    finish_image(recipe, status)
+    return recipe.id
+
+
+def requeue_stale_images():
+    """
+    取出後超過 IMAGE_PROCESSING_TIMEOUT 秒仍在 processing 的工作 (worker 中途結束)
+    放回佇列
+    result: 放回的筆數
+    """
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.IMAGE_PROCESSING_TIMEOUT)
+    return Recipe.objects.filter(
+        image_status=Recipe.ImageStatus.PROCESSING,
+        image_claimed_at__lt=cutoff,
+    ).update(image_status=Recipe.ImageStatus.PENDING, image_claimed_at=None)
+
+
+def process_pending_images(limit=None):
+    """
+    處理佇列直到清空 (或達到 limit 筆)
+    result: 處理的筆數
+    """
+    requeue_stale_images()
+    count = 0
+    while limit is None or count < limit:
+        if process_next_image() is None:
+            break
+        count += 1
+    return count
+
+
+def run_worker(poll_interval=1.0, should_stop=lambda: False):
+    """常駐迴圈：佇列為空時每 poll_interval 秒檢查一次"""
+    while not should_stop():
+        close_old_connections()  # 不在請求週期內，需自行回收過期的連線
+        if requeue_stale_images():
+            logger.warning('Requeued interrupted image jobs')
+        if process_next_image() is None:
+            time.sleep(poll_interval)
@@ -0,0 +1,95 @@
+"""
+Tests for tag / ingredient autocomplete.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.autocomplete import clear_cache, trigram_available
+
+TAG_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENT_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class AutocompleteTests(TestCase):
+    """Test the autocomplete action."""
+
+    def setUp(self):
+        clear_cache()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def names(self, url, q, **params):
+        res = self.client.get(url, {'q': q, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_prefix_matches_shortest_first(self):
+        """Test names starting with the input are returned, shortest first."""
+        for name in ['Garlic powder', 'Garlic', 'Ginger', 'Black garlic']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        names = self.names(INGREDIENT_AUTOCOMPLETE_URL, 'gar')
+
+        self.assertEqual(names[:2], ['Garlic', 'Garlic powder'])
+        self.assertNotIn('Ginger', names)
+
+    def test_limit(self):
+        """Test the number of matches is capped."""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Quick {i}')
+
+        names = self.names(TAG_AUTOCOMPLETE_URL, 'quick', limit=3)
+
+        self.assertEqual(len(names), 3)
+
+    def test_limited_to_user(self):
+        """Test other users' names are never suggested."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123')
+        Tag.objects.create(user=other, name='Private')
+
+        self.assertEqual(self.names(TAG_AUTOCOMPLETE_URL, 'pri'), [])
+
+    def test_empty_query(self):
+        """Test an empty query returns no suggestions."""
+        Tag.objects.create(user=self.user, name='Lunch')
+
+        self.assertEqual(self.names(TAG_AUTOCOMPLETE_URL, ' '), [])
+
+    def test_repeated_prefix_served_from_memory(self):
+        """Test a hot prefix is answered without database queries."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        self.names(TAG_AUTOCOMPLETE_URL, 'din')
+
+        with self.assertNumQueries(0):
+            names = self.names(TAG_AUTOCOMPLETE_URL, 'DIN')
+
+        self.assertEqual(names, ['Dinner'])
+
+    def test_new_name_visible_after_write(self):
+        """Test cached suggestions are refreshed after a new tag."""
+        Tag.objects.create(user=self.user, name='Dessert')
+        self.names(TAG_AUTOCOMPLETE_URL, 'de')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(user=self.user, name='Deli')
+
+        self.assertEqual(
+            self.names(TAG_AUTOCOMPLETE_URL, 'de'), ['Deli', 'Dessert'])
+
+    def test_fuzzy_matches(self):
+        """Test misspelled input finds similar names via pg_trgm."""
+        if not trigram_available():
+            self.skipTest('pg_trgm extension is not installed')
+        Ingredient.objects.create(user=self.user, name='Mozzarella')
+
+        names = self.names(INGREDIENT_AUTOCOMPLETE_URL, 'mozarela')
+
+        self.assertEqual(names, ['Mozzarella'])
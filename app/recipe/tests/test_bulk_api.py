@@ -0,0 +1,176 @@
+"""
+Tests for the bulk recipe import/export API.
+"""
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.parsers import NDJSONParser
+from recipe.serializers import RecipeDetailSerializer
+
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def recipe_payload(index, **params):
+    """Return a sample recipe payload for bulk import."""
+    payload = {
+        'title': f'Bulk recipe {index}',
+        'time_minutes': 10 + index,
+        'price': '3.50',
+        'description': 'Imported',
+        'tags': [{'name': 'Imported'}, {'name': f'Tag {index % 3}'}],
+        'ingredients': [{'name': 'Salt'}, {'name': f'Ingredient {index}'}],
+    }
+    payload.update(params)
+    return payload
+
+
+class NDJSONParserTests(SimpleTestCase):
+    """Test NDJSON request bodies are parsed line by line."""
+
+    body = '{"title": "晚餐", "price": "5.00"}\n\n{"n": 1.5}\n'.encode()
+    expected = [{'title': '晚餐', 'price': '5.00'}, {'n': 1.5}]
+
+    def parse(self, body):
+        return NDJSONParser().parse(
+            io.BytesIO(body), parser_context={'encoding': 'utf-8'})
+
+    def test_parses_lines_with_orjson(self):
+        """Test UTF-8 lines are decoded by orjson, not the stdlib."""
+        with patch('recipe.parsers.json.loads',
+                   side_effect=AssertionError('stdlib used')):
+            self.assertEqual(self.parse(self.body), self.expected)
+
+    def test_without_orjson(self):
+        """Test the parser works when orjson is not installed."""
+        with patch('recipe.parsers.orjson', None):
+            self.assertEqual(self.parse(self.body), self.expected)
+
+    def test_invalid_line_reports_line_number(self):
+        """Test a malformed line raises a ParseError naming the line."""
+        with self.assertRaisesMessage(ParseError, 'line 2'):
+            self.parse(b'{"title": "ok"}\n{"title": \n')
+
+
+class PrivateBulkRecipeApiTests(TestCase):
+    """Test authenticated bulk import/export requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_import_json_array(self):
+        """Test importing a JSON array of recipes."""
+        payload = [recipe_payload(i) for i in range(5)]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 5)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name='Imported').count(), 1)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 6)
+        recipe = recipes.get(id=res.data['ids'][2])
+        self.assertEqual(recipe.title, 'Bulk recipe 2')
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Imported', 'Tag 2'},
+        )
+
+    def test_bulk_import_ndjson(self):
+        """Test importing newline-delimited JSON."""
+        body = '\n'.join(
+            json.dumps(recipe_payload(i)) for i in range(3)) + '\n'
+
+        res = self.client.post(
+            BULK_URL, body, content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_import_reports_item_errors(self):
+        """Test invalid items are reported and nothing is written."""
+        payload = [
+            recipe_payload(0),
+            recipe_payload(1, time_minutes='abc'),
+            recipe_payload(2),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['errors']), 1)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertIn('time_minutes', res.data['errors'][0]['errors'])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_import_queries_independent_of_size(self):
+        """Test the number of queries does not grow with the batch."""
+        def import_count(start, count):
+            payload = [
+                recipe_payload(i, tags=[{'name': f'Batch {start}'}])
+                for i in range(start, start + count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx)
+
+        self.assertEqual(import_count(0, 3), import_count(100, 60))
+
+    def test_export_streams_ndjson(self):
+        """Test exporting recipes as NDJSON lines."""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Exported',
+            time_minutes=5,
+            price=Decimal('1.25'),
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Quick'))
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123')
+        Recipe.objects.create(
+            user=other, title='Hidden', time_minutes=1, price=Decimal('1'))
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(
+            json.loads(lines[0]),
+            json.loads(json.dumps(RecipeDetailSerializer(recipe).data)),
+        )
+
+    def test_export_round_trips_through_import(self):
+        """Test exported lines can be imported again."""
+        self.client.post(
+            BULK_URL, [recipe_payload(i) for i in range(2)], format='json')
+        body = b''.join(self.client.get(EXPORT_URL).streaming_content)
+
+        res = self.client.post(
+            BULK_URL, body, content_type='application/x-ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 4)
@@ -0,0 +1,412 @@
+"""
+Tests for the per-user response cache.
+"""
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils.http import parse_http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.cache import (
+    bump_user_version,
+    get_cache,
+    get_cache_stats,
+    get_user_version,
+)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Cached recipe',
+        'time_minutes': 10,
+        'price': Decimal('3.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCacheTests(TestCase):
+    """Test caching of list/detail responses."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_second_list_request_served_from_cache(self):
+        """Test a repeated list request does not hit the database."""
+        create_recipe(self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+
+    def test_detail_cached(self):
+        """Test recipe detail responses are cached."""
+        recipe = create_recipe(self.user)
+        self.client.get(detail_url(recipe.id))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data['id'], recipe.id)
+
+    def test_query_params_cached_separately(self):
+        """Test filtered lists use their own cache entries."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        create_recipe(self.user).tags.add(tag)
+        create_recipe(self.user)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_create_invalidates_list(self):
+        """Test creating a recipe through the API invalidates the list."""
+        self.client.get(RECIPES_URL)
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '1.00'}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPES_URL, payload)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tag_rename_invalidates_recipe_list(self):
+        """Test renaming a tag refreshes recipes that render it."""
+        tag = Tag.objects.create(user=self.user, name='Before')
+        create_recipe(self.user).tags.add(tag)
+        self.client.get(RECIPES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('recipe:tag-detail', args=[tag.id]),
+                {'name': 'After'})
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'After')
+
+    def test_m2m_change_invalidates(self):
+        """Test adding a tag to a recipe invalidates tag lists."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bulk_import_invalidates(self):
+        """Test bulk imports invalidate the importing user's cache."""
+        version = get_user_version(self.user.pk)
+        payload = [{'title': 'Bulk', 'time_minutes': 1, 'price': '1.00'}]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('recipe:recipe-bulk'), payload, format='json')
+
+        self.assertGreater(get_user_version(self.user.pk), version)
+
+    def test_other_users_cache_untouched(self):
+        """Test writes by one user do not invalidate another user's cache."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123')
+        version = get_user_version(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(other)
+
+        self.assertEqual(get_user_version(self.user.pk), version)
+
+    def test_write_bumps_version_once(self):
+        """Test one API create invalidates the user's cache exactly once."""
+        payload = {
+            'title': 'Soup', 'time_minutes': 5, 'price': '1.00',
+            'tags': [{'name': 'Vegan'}],
+            'ingredients': [{'name': 'Tofu'}],
+        }
+        version = get_user_version(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_user_version(self.user.pk), version + 1)
+
+    def test_hit_and_miss_counters(self):
+        """Test cache statistics count hits and misses."""
+        before = get_cache_stats()
+
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        after = get_cache_stats()
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 2)
+
+    def test_cache_stats_command(self):
+        """Test the cache_stats command reports and resets the counters."""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        out = StringIO()
+
+        call_command('cache_stats', '--reset', stdout=out)
+
+        self.assertIn('hits 1  misses 1  hit ratio 50.0%', out.getvalue())
+        self.assertEqual(get_cache_stats(), {'hits': 0, 'misses': 0})
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class WithoutSharedCacheTests(TestCase):
+    """Test responses are never cached without a shared cache backend."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def test_responses_not_cached(self):
+        """Test every read renders fresh data without validators."""
+        self.client.get(RECIPES_URL)
+        Recipe.objects.filter(id=self.recipe.id).update(title='Changed')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'Changed')
+        self.assertNotIn('X-Cache', res)
+        self.assertNotIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag / Last-Modified support on recipe endpoints."""
+
+    def setUp(self):
+        get_cache().clear()
+        # 可控制的時鐘：Last-Modified 只在寫入的那一秒過後才提供
+        self.now = 1700000000.0
+        clock = patch('recipe.cache.time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def test_responses_carry_validators(self):
+        """Test list and detail responses include ETag and Last-Modified."""
+        get_user_version(self.user.pk)
+        self.now += 1
+        for url in (RECIPES_URL, detail_url(self.recipe.id)):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIn('ETag', res)
+            self.assertIn('Last-Modified', res)
+
+    def test_matching_etag_returns_304_without_queries(self):
+        """Test If-None-Match returns 304 without touching the database."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(
+                detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_write_in_another_worker_invalidates_etag(self):
+        """Test a version bump made through another cache client is seen."""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        # 另一個 worker：連到同一個快取後端的獨立 client
+        other_worker = caches.create_connection(settings.RECIPE_CACHE_ALIAS)
+        with patch('recipe.cache.get_cache', return_value=other_worker):
+            bump_user_version(self.user.pk)
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_SIZE=0)
+    def test_compressed_response_etag_matches(self):
+        """Test the weak ETag of a compressed response still gets a 304."""
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertTrue(res['ETag'].startswith('W/'))
+
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_update(self):
+        """Test a stale ETag gets a full response after a change."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                detail_url(self.recipe.id), {'title': 'Changed'})
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['results'][0]['title'], 'Changed')
+
+    def test_etag_differs_per_url(self):
+        """Test list and detail ETags are not interchangeable."""
+        list_etag = self.client.get(RECIPES_URL)['ETag']
+
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=list_etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since returns 304 when nothing changed."""
+        get_user_version(self.user.pk)
+        self.now += 1
+        last_modified = self.client.get(RECIPES_URL)['Last-Modified']
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_after_write_in_same_second(self):
+        """Test a write right after a response is not answered with 304."""
+        get_user_version(self.user.pk)
+        self.now += 1
+        last_modified = self.client.get(RECIPES_URL)['Last-Modified']
+        self.now += 0.5
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.user, title='Second')
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', res)  # 與寫入同一秒
+        self.assertEqual(len(res.data['results']), 2)
+
+        self.now += 1
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(parse_http_date(res['Last-Modified']),
+                           parse_http_date(last_modified))
+
+    def test_versions_not_reused_after_eviction(self):
+        """Test a burst of writes then eviction never repeats an ETag."""
+        etags = set()
+        for _ in range(20):
+            bump_user_version(self.user.pk)
+            etags.add(self.client.get(RECIPES_URL)['ETag'])
+        get_cache().clear()  # 版本號被淘汰
+
+        self.now += 1
+        res = self.client.get(RECIPES_URL)
+        bump_user_version(self.user.pk)
+        self.now += 1
+        after_write = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(etags), 20)
+        self.assertNotIn(res['ETag'], etags)
+        self.assertNotIn(after_write['ETag'], etags | {res['ETag']})
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertLessEqual(
+            parse_http_date(after_write['Last-Modified']), self.now)
+
+
+class ConcurrentWriteTests(TransactionTestCase):
+    """Test reads that run while a write transaction is still open."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def get_from_other_connection(self, url, **extra):
+        """Send a GET from another thread (its own database connection)."""
+        result = {}
+
+        def read():
+            try:
+                result['res'] = self.client.get(url, **extra)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+        return result['res']
+
+    def test_read_before_commit_not_served_after_commit(self):
+        """Test data read before a delete commits is not cached past it."""
+        with transaction.atomic():
+            self.recipe.delete()
+            during = self.get_from_other_connection(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(during.data['results']), 1)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'], [])
+
+    def test_etag_from_before_commit_not_matched_after_commit(self):
+        """Test an ETag issued while a delete was open is not a 304 later."""
+        with transaction.atomic():
+            self.recipe.delete()
+            etag = self.get_from_other_connection(RECIPES_URL)['ETag']
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['results'], [])
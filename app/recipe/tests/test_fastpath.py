@@ -0,0 +1,133 @@
+"""
+Parity tests for the .values() fast path of the recipe list.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import bump_user_version
+from recipe.fastpath import RowRenderer
+from recipe.queries import plan_recipe_queryset
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class FastPathParityTests(TestCase):
+    """Test the fast path renders byte-identical output."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.request = APIRequestFactory().get(RECIPES_URL)
+
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ['Vegan', 'Quick', '晚餐']]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ['Rice', 'Tofu "firm"']]
+        prices = ['0.50', '12.00', '999.99', '7.05']
+        with self.captureOnCommitCallbacks(execute=True):  # search_vector
+            for i, price in enumerate(prices):
+                recipe = Recipe.objects.create(
+                    user=self.user,
+                    title=f'Recipe {i} – été',
+                    description='Line one\nline two' if i % 2 else '',
+                    time_minutes=i * 7,
+                    price=Decimal(price),
+                    link='https://example.com/r' if i == 1 else '',
+                )
+                recipe.tags.add(*tags[:i])
+                recipe.ingredients.add(*ingredients[i % 2:])
+
+        first, second = Recipe.objects.order_by('id')[:2]
+        Recipe.objects.filter(id=first.id).update(
+            image='uploads/recipe/ab/abcdef.jpg',
+            image_status=Recipe.ImageStatus.READY)
+        Recipe.objects.filter(id=second.id).update(
+            image='uploads/recipe/cd/cdef01.jpg',
+            image_status=Recipe.ImageStatus.PENDING)
+
+    def assertParity(self, serializer_class, **kwargs):
+        context = {'request': self.request}
+        serializer = serializer_class(context=context, **kwargs)
+        renderer = RowRenderer.for_serializer(serializer)
+        self.assertIsNotNone(renderer)
+
+        recipes = Recipe.objects.order_by('-id')
+        instances = plan_recipe_queryset(recipes, serializer)
+        expected = serializer_class(
+            instances, many=True, context=context, **kwargs).data
+        actual = renderer.render(recipes.values(*renderer.columns))
+
+        json = JSONRenderer()
+        self.assertEqual(json.render(actual), json.render(expected))
+
+    def test_list_serializer_parity(self):
+        """Test RecipeSerializer output matches."""
+        self.assertParity(RecipeSerializer)
+
+    def test_detail_serializer_parity(self):
+        """Test RecipeDetailSerializer output matches."""
+        self.assertParity(RecipeDetailSerializer)
+
+    def test_projection_parity(self):
+        """Test projected serializers output matches."""
+        self.assertParity(
+            RecipeSerializer, fields=['id', 'title', 'time_minutes'])
+        self.assertParity(
+            RecipeDetailSerializer, exclude=['tags', 'description'])
+        self.assertParity(RecipeSerializer, fields=['price', 'ingredients'])
+
+    def test_unsupported_field_falls_back(self):
+        """Test serializers with unknown field types are not handled."""
+        class CustomSerializer(RecipeSerializer):
+            extra = serializers.SerializerMethodField()
+
+            class Meta(RecipeSerializer.Meta):
+                fields = RecipeSerializer.Meta.fields + ['extra']
+
+            def get_extra(self, obj):
+                return obj.title.upper()
+
+        self.assertIsNone(RowRenderer.for_serializer(CustomSerializer()))
+
+    def get_bytes(self, params, fast):
+        bump_user_version(self.user.pk)  # 不使用前一次的快取回應
+        with patch.object(RecipeViewSet, 'fast_list', fast):
+            res = self.client.get(RECIPES_URL, params, format='json')
+        self.assertEqual(res.status_code, 200)
+        return res.content
+
+    def test_api_parity(self):
+        """Test list responses are byte-identical with and without it."""
+        cases = [
+            {},
+            {'page_size': 2},
+            {'fields': 'id,title,image_variants'},
+            {'tags': str(Tag.objects.get(name='Vegan').id)},
+            {'q': 'recipe'},
+        ]
+        for params in cases:
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.get_bytes(params, fast=True),
+                    self.get_bytes(params, fast=False))
+
+    def test_api_uses_fast_path(self):
+        """Test the list view renders through RowRenderer."""
+        with patch.object(RowRenderer, 'render', autospec=True,
+                          side_effect=RowRenderer.render) as render:
+            self.get_bytes({}, fast=True)
+
+        render.assert_called_once()
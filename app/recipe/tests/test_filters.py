@@ -0,0 +1,139 @@
+"""
+Tests for tag / ingredient filtering of the recipe list.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.benchmark import seed_dataset
+from core.models import Recipe, Tag, Ingredient
+from recipe.queries import filter_by_related
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, title, tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=Decimal('5.00'))
+    recipe.tags.add(*tags)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+class RecipeFilterTests(TestCase):
+    """Test any/all filtering through the API."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        self.both = create_recipe(
+            self.user, 'Both', tags=[self.vegan, self.quick],
+            ingredients=[self.tofu])
+        self.vegan_only = create_recipe(
+            self.user, 'Vegan only', tags=[self.vegan])
+        self.none = create_recipe(self.user, 'None')
+
+    def ids(self, **params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def test_match_any_is_default(self):
+        """Test recipes with any of the tags are returned once each."""
+        ids = self.ids(tags=f'{self.vegan.id},{self.quick.id}')
+
+        self.assertEqual(ids, [self.vegan_only.id, self.both.id])
+
+    def test_match_all(self):
+        """Test match=all only returns recipes having every tag."""
+        ids = self.ids(tags=f'{self.vegan.id},{self.quick.id}', match='all')
+
+        self.assertEqual(ids, [self.both.id])
+
+    def test_match_all_ignores_duplicate_ids(self):
+        """Test repeated ids do not make match=all impossible."""
+        ids = self.ids(tags=f'{self.vegan.id},{self.vegan.id}', match='all')
+
+        self.assertEqual(ids, [self.vegan_only.id, self.both.id])
+
+    def test_match_all_tags_and_ingredients(self):
+        """Test tags and ingredients filters are combined."""
+        ids = self.ids(tags=str(self.vegan.id),
+                       ingredients=str(self.tofu.id), match='all')
+
+        self.assertEqual(ids, [self.both.id])
+
+    def test_invalid_match_mode(self):
+        """Test unknown match values are rejected."""
+        res = self.client.get(
+            RECIPES_URL, {'tags': str(self.vegan.id), 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_uses_subquery_without_distinct(self):
+        """Test filtering neither joins the link table nor uses DISTINCT."""
+        for match in ('any', 'all'):
+            with CaptureQueriesContext(connection) as ctx:
+                self.ids(tags=f'{self.vegan.id},{self.quick.id}',
+                         match=match)
+
+            sql = ctx.captured_queries[0]['sql']
+            self.assertNotIn('DISTINCT', sql)
+            self.assertNotIn('JOIN', sql)
+
+    def test_filter_query_count(self):
+        """Test filtered lists take as many queries as unfiltered ones."""
+        with CaptureQueriesContext(connection) as unfiltered:
+            self.ids()
+
+        with self.assertNumQueries(len(unfiltered)):
+            self.ids(tags=f'{self.vegan.id},{self.quick.id}', match='all')
+
+
+class SeededFilterTests(TestCase):
+    """Compare the subquery filters with join-based reference queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            users=2, recipes_per_user=200, tags_per_user=10,
+            ingredients_per_user=20, tags_per_recipe=3,
+            ingredients_per_recipe=4, seed=7)[0]
+        cls.tag_ids = list(Tag.objects.filter(
+            user=cls.user).order_by('id').values_list('id', flat=True)[:2])
+
+    def test_any_matches_join_distinct(self):
+        """Test EXISTS returns the same recipes as join + DISTINCT."""
+        recipes = Recipe.objects.filter(user=self.user)
+        expected = set(recipes.filter(
+            tags__id__in=self.tag_ids).distinct().values_list('id', flat=True))
+
+        result = set(filter_by_related(
+            recipes, 'tags', self.tag_ids).values_list('id', flat=True))
+
+        self.assertTrue(expected)
+        self.assertEqual(result, expected)
+
+    def test_all_matches_chained_joins(self):
+        """Test grouped counting returns the same as one join per tag."""
+        recipes = Recipe.objects.filter(user=self.user)
+        expected = recipes
+        for tag_id in self.tag_ids:
+            expected = expected.filter(tags__id=tag_id)
+
+        result = filter_by_related(recipes, 'tags', self.tag_ids, 'all')
+
+        self.assertEqual(set(result.values_list('id', flat=True)),
+                         set(expected.values_list('id', flat=True)))
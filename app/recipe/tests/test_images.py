@@ -0,0 +1,377 @@
+"""
+Tests for the recipe image pipeline.
+"""
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from drf_spectacular.generators import SchemaGenerator
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.storage import get_image_storage
+from recipe.images import delete_variants, release_image, variant_name
+from recipe.tasks import process_next_image, process_pending_images
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+class ImagePipelineTests(TestCase):
+    """Test thumbnails generated on upload."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'password123')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Photo', time_minutes=5,
+            price=Decimal('1.00'))
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        delete_variants(self.recipe.image.name)
+        self.recipe.image.delete()
+
+    def _upload(self, size=(2000, 1000), exif=None, process=True):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', size, color='red')
+            img.save(image_file, format='JPEG', exif=exif or b'')
+            image_file.seek(0)
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': image_file},
+                format='multipart')
+        if process:
+            process_pending_images()
+        self.recipe.refresh_from_db()
+        return res
+
+    def _open_variant(self, variant):
+        name = variant_name(self.recipe.image.name, variant)
+        return Image.open(self.recipe.image.storage.open(name))
+
+    def test_variants_generated_as_webp(self):
+        """Test each variant is stored as a downscaled WebP."""
+        res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        thumbnail = self._open_variant('thumbnail')
+        medium = self._open_variant('medium')
+        self.assertEqual(thumbnail.format, 'WEBP')
+        self.assertEqual(thumbnail.size, (320, 160))
+        self.assertEqual(medium.size, (1024, 512))
+
+    def test_small_images_not_upscaled(self):
+        """Test variants never exceed the original size."""
+        self._upload(size=(100, 50))
+
+        self.assertEqual(self._open_variant('medium').size, (100, 50))
+
+    def test_metadata_stripped_and_orientation_applied(self):
+        """Test EXIF is dropped after rotating by its orientation tag."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees
+        exif[0x010F] = 'Camera maker'
+
+        self._upload(size=(400, 200), exif=exif.tobytes())
+
+        thumbnail = self._open_variant('thumbnail')
+        self.assertEqual(thumbnail.size, (160, 320))
+        self.assertEqual(dict(thumbnail.getexif()), {})
+
+    def test_variant_urls_in_responses(self):
+        """Test list and detail responses expose variant URLs."""
+        self._upload()
+
+        detail = self.client.get(detail_url(self.recipe.id))
+        self.assertIn('thumbnail', detail.data['image_variants'])
+        res = self.client.get(RECIPES_URL)
+
+        urls = res.data['results'][0]['image_variants']
+        self.assertTrue(urls['thumbnail'].endswith('_thumbnail.webp'))
+        self.assertTrue(urls['medium'].startswith('http://testserver/'))
+
+    def test_no_image_has_no_variants(self):
+        """Test recipes without an image render null variants."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIsNone(res.data['results'][0]['image_variants'])
+
+
+class BackgroundProcessingTests(TestCase):
+    """Test image processing is deferred to the background worker."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'password123')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Photo', time_minutes=5,
+            price=Decimal('1.00'))
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        delete_variants(self.recipe.image.name)
+        self.recipe.image.delete()
+
+    def _upload(self):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (100, 100)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id), {'image': image_file},
+                format='multipart')
+
+    def test_upload_queues_processing(self):
+        """Test upload returns before variants are generated."""
+        with patch('recipe.tasks.generate_variants') as mock_generate:
+            res = self._upload()
+
+        mock_generate.assert_not_called()
+        self.assertEqual(res.data['image_status'], 'pending')
+        self.assertIsNone(res.data['image_variants'])
+        detail = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(detail.data['image_status'], 'pending')
+
+    def test_worker_marks_ready(self):
+        """Test the worker processes the queue and reports ready."""
+        self._upload()
+
+        self.assertEqual(process_pending_images(), 1)
+
+        detail = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(detail.data['image_status'], 'ready')
+        self.assertEqual(process_pending_images(), 0)
+
+    def test_worker_marks_failed(self):
+        """Test processing errors are recorded instead of retried forever."""
+        self._upload()
+
+        with patch('recipe.tasks.generate_variants',
+                   side_effect=OSError('broken')), \
+                self.assertLogs('recipe.tasks', level='ERROR'):
+            process_pending_images()
+
+        detail = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(detail.data['image_status'], 'failed')
+        self.assertIsNone(detail.data['image_variants'])
+
+    def test_claim_committed_before_processing(self):
+        """Test the job is marked processing while variants are generated."""
+        self._upload()
+        statuses = []
+
+        def generate(image):
+            statuses.append(
+                Recipe.objects.get(id=self.recipe.id).image_status)
+
+        with patch('recipe.tasks.generate_variants', side_effect=generate):
+            process_pending_images()
+
+        self.assertEqual(statuses, ['processing'])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'ready')
+        self.assertIsNone(self.recipe.image_claimed_at)
+
+    def test_replaced_image_not_overwritten(self):
+        """Test a result for a replaced image does not mark the new one."""
+        self._upload()
+        original = Recipe.objects.get(id=self.recipe.id).image.name
+
+        def replace(image):
+            # 處理期間使用者換了一張圖片
+            Recipe.objects.filter(id=self.recipe.id).update(
+                image='uploads/recipe/other.jpg', image_status='pending')
+
+        with patch('recipe.tasks.generate_variants', side_effect=replace), \
+                patch('recipe.tasks.release_image') as mock_release:
+            process_next_image()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'pending')
+        mock_release.assert_called_once_with(original)
+        Recipe.objects.filter(id=self.recipe.id).update(image=original)
+
+    def test_stale_processing_requeued(self):
+        """Test jobs left in processing by a dead worker are retried."""
+        self._upload()
+        Recipe.objects.filter(id=self.recipe.id).update(
+            image_status='processing',
+            image_claimed_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(process_pending_images(), 1)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, 'ready')
+
+    def test_recent_processing_left_alone(self):
+        """Test jobs still within the timeout are not claimed twice."""
+        self._upload()
+        Recipe.objects.filter(id=self.recipe.id).update(
+            image_status='processing', image_claimed_at=timezone.now())
+
+        self.assertEqual(process_pending_images(), 0)
+
+
+class SharedImageTests(TestCase):
+    """Test identical uploads share files and are reference counted."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'password123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'Photo {i}', time_minutes=5,
+                price=Decimal('1.00'))
+            for i in range(2)
+        ]
+
+    def tearDown(self):
+        for recipe in Recipe.objects.exclude(image=''):
+            delete_variants(recipe.image.name)
+            recipe.image.delete()
+
+    def _upload(self, recipe, color='red'):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (60, 60), color=color).save(
+                image_file, format='JPEG')
+            image_file.seek(0)
+            self.client.post(
+                image_upload_url(recipe.id), {'image': image_file},
+                format='multipart')
+        process_pending_images()
+        recipe.refresh_from_db()
+        return recipe.image
+
+    def test_identical_uploads_share_file(self):
+        """Test the same photo on two recipes is stored once."""
+        first = self._upload(self.recipes[0])
+        second = self._upload(self.recipes[1])
+
+        self.assertEqual(first.name, second.name)
+        self.assertEqual(self.recipes[1].image_status, 'ready')
+
+    def test_delete_keeps_shared_file(self):
+        """Test deleting one recipe keeps an image still in use."""
+        image = self._upload(self.recipes[0])
+        self._upload(self.recipes[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+
+        self.assertTrue(image.storage.exists(image.name))
+
+    def test_delete_last_reference_removes_files(self):
+        """Test the image and variants are removed with the last recipe."""
+        image = self._upload(self.recipes[0])
+        thumbnail = variant_name(image.name, 'thumbnail')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+
+        self.assertFalse(image.storage.exists(image.name))
+        self.assertFalse(image.storage.exists(thumbnail))
+
+    def test_replacing_image_releases_previous(self):
+        """Test uploading a new image removes the unused old one."""
+        old = self._upload(self.recipes[0], color='red')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new = self._upload(self.recipes[0], color='blue')
+
+        self.assertNotEqual(old.name, new.name)
+        self.assertFalse(old.storage.exists(old.name))
+
+
+class SharedImageRaceTests(TransactionTestCase):
+    """Test sharing and releasing the same file from two connections."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'password123')
+        self.recipe = Recipe.objects.create(
+            user=user, title='Photo', time_minutes=5,
+            price=Decimal('1.00'))
+        self.storage = get_image_storage()
+        self.name = self.storage.save(
+            'uploads/recipe/photo.jpg', ContentFile(b'photo'))
+
+    def tearDown(self):
+        self.storage.delete(self.name)
+
+    def test_release_waits_for_uncommitted_share(self):
+        """Test a file reused by an open transaction is not deleted."""
+        shared = threading.Event()
+        done = threading.Event()
+        result = {}
+
+        def upload():
+            try:
+                with transaction.atomic():
+                    result['name'] = self.storage.save(
+                        'uploads/recipe/copy.jpg', ContentFile(b'photo'))
+                    shared.set()
+                    done.wait(5)
+                    Recipe.objects.filter(id=self.recipe.id).update(
+                        image=result['name'])
+            finally:
+                connection.close()
+
+        def release():
+            try:
+                release_image(self.name)
+            finally:
+                connection.close()
+
+        uploader = threading.Thread(target=upload)
+        uploader.start()
+        self.assertTrue(shared.wait(5))
+        releaser = threading.Thread(target=release)
+        releaser.start()
+        releaser.join(0.2)
+        self.assertTrue(releaser.is_alive())
+        done.set()
+        uploader.join(5)
+        releaser.join(5)
+
+        self.assertEqual(result['name'], self.name)
+        self.assertTrue(self.storage.exists(self.name))
+
+
+class ImageVariantsSchemaTests(SimpleTestCase):
+    """Test the OpenAPI schema documents image_variants."""
+
+    def test_variants_documented_as_url_object(self):
+        """Test image_variants is a nullable object of variant URLs."""
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+
+        field = schema['components']['schemas']['RecipeDetail'][
+            'properties']['image_variants']
+        self.assertEqual(field['type'], 'object')
+        self.assertTrue(field['nullable'])
+        self.assertEqual(
+            field['properties']['thumbnail'],
+            {'type': 'string', 'format': 'uri'})
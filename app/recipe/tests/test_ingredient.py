@@ -13,7 +13,8 @@ from rest_framework.test import APIClient
 
 from core.models import Ingredient, Recipe
 
-from recipe.serializers import IngredientSerializer
+from recipe.counts import annotate_recipe_counts
+from recipe.serializers import IngredientUsageSerializer
 
 
 Ingredient_URL = reverse('recipe:ingredient-list')
@@ -59,10 +60,11 @@ class PrivateIngredientApitest(TestCase):
 
         res = self.client.get(Ingredient_URL)
 
-        ingredients = Ingredient.objects.all().order_by('-name')
-        serializer = IngredientSerializer(ingredients, many=True)
+        ingredients = annotate_recipe_counts(
+            Ingredient.objects.all()).order_by('-name')
+        serializer = IngredientUsageSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """限制使用者"""
@@ -73,10 +75,10 @@ class PrivateIngredientApitest(TestCase):
         res = self.client.get(Ingredient_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
-        self.assertEqual(res.data[0]['name'], own.name)
-        self.assertEqual(res.data[0]['id'], own.id)
+        self.assertEqual(res.data['results'][0]['name'], own.name)
+        self.assertEqual(res.data['results'][0]['id'], own.id)
 
     def test_update_ingredient(self):
         """Test updating an ingredient."""
@@ -115,10 +117,11 @@ class PrivateIngredientApitest(TestCase):
 
         res = self.client.get(Ingredient_URL, {'assigned_only': 1})
 
-        s1 = IngredientSerializer(in1)
-        s2 = IngredientSerializer(in2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        annotated = annotate_recipe_counts(Ingredient.objects.all())
+        s1 = IngredientUsageSerializer(annotated.get(id=in1.id))
+        s2 = IngredientUsageSerializer(annotated.get(id=in2.id))
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_ingredients_unique(self):
         """Test filtered ingredients returns a unique list."""
@@ -141,4 +144,4 @@ class PrivateIngredientApitest(TestCase):
 
         res = self.client.get(Ingredient_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,85 @@
+"""
+Tests for ?fields= / ?exclude= projection on the recipe endpoints.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeProjectionTests(TestCase):
+    """Test sparse fieldsets trim both the output and the SQL."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Soup',
+            description='Warm and simple',
+            time_minutes=10,
+            price=Decimal('3.00'),
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Dinner'))
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, ctx.captured_queries[-1]['sql']
+
+    def test_list_fields(self):
+        """Test ?fields= renders and selects only the requested columns."""
+        res, sql = self.get(RECIPES_URL, fields='id,title,time_minutes')
+
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': 'Soup', 'time_minutes': 10}])
+        self.assertIn('"time_minutes"', sql)
+        self.assertNotIn('"price"', sql)
+        self.assertNotIn('"tags_summary"', sql)
+        self.assertNotIn('"image"', sql)
+
+    def test_detail_exclude(self):
+        """Test ?exclude= drops fields from the detail response and SQL."""
+        res, sql = self.get(
+            detail_url(self.recipe.id), exclude='description,tags')
+
+        self.assertNotIn('description', res.data)
+        self.assertNotIn('tags', res.data)
+        self.assertEqual(res.data['ingredients'], [])
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"tags_summary"', sql)
+
+    def test_unknown_field_rejected(self):
+        """Test unknown field names return 400."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+    def test_writes_ignore_projection(self):
+        """Test projection does not restrict writable fields on update."""
+        res = self.client.patch(
+            detail_url(self.recipe.id) + '?fields=id',
+            {'title': 'Stew'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Stew')
+        self.assertIn('description', res.data)
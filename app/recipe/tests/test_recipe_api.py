@@ -1,18 +1,24 @@
 from decimal import Decimal
 
+import json
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from recipe.images import delete_variants
+from recipe.pagination import RecipeCursorPagination
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse('recipe:recipe-list')
@@ -78,7 +84,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test list of recipes is limited to authenticated user."""
@@ -93,7 +99,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test get recipe detail."""
@@ -382,9 +388,9 @@ class PrivateRecipeAPITests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients."""
@@ -402,9 +408,151 @@ class PrivateRecipeAPITests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def _create_recipes_with_relations(self, count):
+        """建立多筆附帶標籤與食材的食譜"""
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {recipe.id}'))
+            recipe.ingredients.add(Ingredient.objects.create(
+                user=self.user, name=f'Ing {recipe.id}'))
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes uses a fixed number of queries."""
+        self._create_recipes_with_relations(2)
+        with CaptureQueriesContext(connection) as few:
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_recipes_with_relations(10)
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(len(many), 1)
+
+    def test_list_selects_only_rendered_columns(self):
+        """Test the list query skips columns the serializer never renders."""
+        self._create_recipes_with_relations(1)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL)
+
+        recipe_sql = ctx.captured_queries[0]['sql']
+        self.assertIn('"title"', recipe_sql)
+        self.assertNotIn('"description"', recipe_sql)
+
+    def test_detail_reads_relation_summaries(self):
+        """Test recipe detail renders tags and ingredients in one query."""
+        self._create_recipes_with_relations(1)
+        recipe = Recipe.objects.get(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Extra'))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+    def test_list_paginated_by_cursor(self):
+        """Test recipe list pages follow the cursor without overlap."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(item['id'] for item in res.data['results'])
+
+        self.assertEqual(ids, sorted((r.id for r in recipes), reverse=True))
+
+    def test_list_page_size_capped(self):
+        """Test clients cannot request more than the maximum page size."""
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        with patch.object(RecipeCursorPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPES_URL, {'page_size': 1000})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def _create_with_ingredients(self, count):
+        """建立帶有 count 個新食材的食譜並回傳使用的查詢數"""
+        payload = {
+            'title': f'Recipe with {count} ingredients',
+            'time_minutes': 30,
+            'price': Decimal('5.00'),
+            'tags': [{'name': f'Tag {count}'}],
+            'ingredients': [
+                {'name': f'Ingredient {count}-{i}'} for i in range(count)
+            ],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return len(ctx)
+
+    def test_create_recipe_queries_independent_of_ingredients(self):
+        """Test tags/ingredients are resolved in batches on create."""
+        few = self._create_with_ingredients(2)
+        many = self._create_with_ingredients(30)
+
+        self.assertEqual(few, many)
+        recipe = Recipe.objects.get(title='Recipe with 30 ingredients')
+        self.assertEqual(recipe.ingredients.count(), 30)
+
+    def test_create_recipe_duplicate_tag_names(self):
+        """Test repeated names in the payload create a single tag."""
+        payload = {
+            'title': 'Duplicate tags',
+            'time_minutes': 5,
+            'price': Decimal('1.00'),
+            'tags': [{'name': 'Quick'}, {'name': 'Quick'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(len(res.data['tags']), 1)
+
+    def test_update_tags_only_changes_diff(self):
+        """Test updating tags keeps unchanged relations in place."""
+        recipe = create_recipe(user=self.user)
+        tag_keep = Tag.objects.create(user=self.user, name='Keep')
+        tag_drop = Tag.objects.create(user=self.user, name='Drop')
+        recipe.tags.add(tag_keep, tag_drop)
+        through = Recipe.tags.through
+        kept_row = through.objects.get(recipe=recipe, tag=tag_keep)
+
+        payload = {'tags': [{'name': 'Keep'}, {'name': 'New'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(through.objects.filter(id=kept_row.id).exists())
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Keep', 'New'},
+        )
+
+    def test_list_ndjson_streams_all_recipes(self):
+        """Test ?format=ndjson streams every recipe without paging."""
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+
+        params = {'format': 'ndjson', 'page_size': 1}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        ids = [json.loads(line)['id'] for line in lines]
+        self.assertEqual(ids, sorted((r.id for r in recipes), reverse=True))
 
 
 class ImageUploadTests(TestCase):
@@ -420,6 +568,8 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        delete_variants(self.recipe.image.name)
         self.recipe.image.delete()
 
     def test_upload_image(self):
@@ -548,9 +698,9 @@ class ImageUploadTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients."""
@@ -568,6 +718,6 @@ class ImageUploadTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
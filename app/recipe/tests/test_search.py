@@ -0,0 +1,171 @@
+"""
+Tests for full-text recipe search.
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeSearchTests(TestCase):
+    """Test the ?q= search mode of the recipe list."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, user=None, tags=(), ingredients=(), **params):
+        """Create a recipe through the ORM and commit its search vector."""
+        defaults = {
+            'title': 'Plain dish',
+            'time_minutes': 10,
+            'price': Decimal('5.00'),
+        }
+        defaults.update(params)
+        user = user or self.user
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(user=user, **defaults)
+            for name in tags:
+                recipe.tags.add(Tag.objects.create(user=user, name=name))
+            for name in ingredients:
+                recipe.ingredients.add(
+                    Ingredient.objects.create(user=user, name=name))
+        return recipe
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """Test titles and descriptions are searchable."""
+        soup = self.create_recipe(title='Tomato soup')
+        salad = self.create_recipe(description='A fresh tomato salad')
+        self.create_recipe(title='Beef stew')
+
+        self.assertCountEqual(self.search('tomato'), [soup.id, salad.id])
+
+    def test_search_tag_and_ingredient_names(self):
+        """Test tag and ingredient names are searchable."""
+        vegan = self.create_recipe(tags=['Vegan'])
+        garlic = self.create_recipe(ingredients=['Garlic'])
+
+        self.assertEqual(self.search('vegan'), [vegan.id])
+        self.assertEqual(self.search('garlic'), [garlic.id])
+
+    def test_results_ranked(self):
+        """Test title matches rank above description matches."""
+        weak = self.create_recipe(description='Goes well with curry rice')
+        strong = self.create_recipe(title='Curry')
+
+        self.assertEqual(self.search('curry'), [strong.id, weak.id])
+
+    def test_websearch_syntax(self):
+        """Test quoted phrases and exclusions are supported."""
+        keep = self.create_recipe(title='Green curry')
+        self.create_recipe(title='Red curry')
+
+        self.assertEqual(self.search('curry -red'), [keep.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are not returned."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123')
+        self.create_recipe(user=other, title='Secret pie')
+
+        self.assertEqual(self.search('pie'), [])
+
+    def test_tag_rename_updates_search(self):
+        """Test renaming a tag refreshes linked recipes."""
+        recipe = self.create_recipe(tags=['Breakfast'])
+        tag = recipe.tags.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('recipe:tag-detail', args=[tag.id]),
+                {'name': 'Brunch'})
+
+        self.assertEqual(self.search('brunch'), [recipe.id])
+        self.assertEqual(self.search('breakfast'), [])
+
+    def test_api_create_and_update_indexed(self):
+        """Test recipes written through the API are searchable."""
+        payload = {
+            'title': 'Pancakes', 'time_minutes': 10, 'price': '2.00',
+            'tags': [{'name': 'Sweet'}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+        recipe_id = res.data['id']
+        self.assertEqual(self.search('sweet'), [recipe_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('recipe:recipe-detail', args=[recipe_id]),
+                {'title': 'Waffles'})
+
+        self.assertEqual(self.search('waffles'), [recipe_id])
+        self.assertEqual(self.search('pancakes'), [])
+
+    def test_create_updates_search_vector_once(self):
+        """Test one API create runs a single search_vector UPDATE."""
+        payload = {
+            'title': 'Pancakes', 'time_minutes': 10, 'price': '2.00',
+            'tags': [{'name': 'Sweet'}],
+            'ingredients': [{'name': 'Flour'}],
+        }
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(self.search('flour'), [res.data['id']])
+
+    def test_rebuild_command_repairs_search_vectors(self):
+        """Test a search_vector left stale after commit can be rebuilt."""
+        recipe = self.create_recipe(title='Tomato soup')
+        Recipe.objects.filter(id=recipe.id).update(search_vector=None)
+        self.assertEqual(self.search('tomato'), [])
+
+        with self.assertRaisesMessage(CommandError, 'search vectors'):
+            call_command('rebuild_recipe_summaries', verify=True)
+        call_command('rebuild_recipe_summaries', stdout=StringIO())
+
+        self.assertEqual(self.search('tomato'), [recipe.id])
+
+    def test_bulk_import_indexed(self):
+        """Test bulk imported recipes are searchable."""
+        payload = [{'title': 'Dumplings', 'time_minutes': 30,
+                    'price': '4.00'}]
+
+        self.client.post(
+            reverse('recipe:recipe-bulk'), payload, format='json')
+
+        self.assertEqual(len(self.search('dumplings')), 1)
+
+    def test_search_paginated_by_page_number(self):
+        """Test search results use page number pagination."""
+        for i in range(3):
+            self.create_recipe(title=f'Noodle {i}')
+
+        res = self.client.get(RECIPES_URL, {'q': 'noodle', 'page_size': 2})
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIn('page=2', res.data['next'])
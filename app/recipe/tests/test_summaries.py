@@ -0,0 +1,248 @@
+"""
+Tests for the denormalized recipe tag / ingredient summaries.
+"""
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.bulk import bulk_create_recipes
+from recipe.summaries import find_stale_summaries
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def tag_url(tag_id):
+    return reverse('recipe:tag-detail', args=[tag_id])
+
+
+def summary(*objs):
+    return [{'id': obj.id, 'name': obj.name} for obj in objs]
+
+
+class RecipeSummaryTests(TestCase):
+    """Test tags_summary / ingredients_summary stay in sync."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, **params):
+        defaults = {
+            'title': 'Sample recipe',
+            'time_minutes': 10,
+            'price': Decimal('5.00'),
+        }
+        defaults.update(params)
+        return Recipe.objects.create(user=self.user, **defaults)
+
+    def assertSummariesFresh(self):
+        self.assertEqual(list(find_stale_summaries(Recipe.objects.all())), [])
+
+    def test_create_and_update_through_api(self):
+        """Test the serializer keeps summaries in the same transaction."""
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '7.50',
+            'tags': [{'name': 'Dinner'}, {'name': 'Spicy'}],
+            'ingredients': [{'name': 'Rice'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        recipe = Recipe.objects.get(id=res.data['id'])
+        dinner = Tag.objects.get(user=self.user, name='Dinner')
+        spicy = Tag.objects.get(user=self.user, name='Spicy')
+        rice = Ingredient.objects.get(user=self.user, name='Rice')
+        self.assertEqual(recipe.tags_summary, summary(dinner, spicy))
+        self.assertEqual(recipe.ingredients_summary, summary(rice))
+        self.assertEqual(res.data['tags'], summary(dinner, spicy))
+
+        res = self.client.patch(
+            detail_url(recipe.id), {'tags': [{'name': 'Spicy'}]},
+            format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tags_summary, summary(spicy))
+        self.assertEqual(res.data['tags'], summary(spicy))
+        self.assertEqual(recipe.ingredients_summary, summary(rice))
+
+    def test_summaries_ordered_by_id(self):
+        """Test summary entries come out by id, not by link order."""
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('A', 'B', 'C')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ('Salt', 'Oil', 'Egg')]
+        # 更新後的資料列移到表尾：表內順序與連結順序都和 id 順序不同
+        for obj in (tags[0], ingredients[0]):
+            obj.save()
+        recipe = self.create_recipe()
+        for index in (2, 0, 1):
+            recipe.tags.add(tags[index])
+            recipe.ingredients.add(ingredients[index])
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tags_summary, summary(*tags))
+        self.assertEqual(recipe.ingredients_summary, summary(*ingredients))
+
+    def test_tag_rename_updates_recipes(self):
+        """Test renaming a tag rewrites the summaries that include it."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = self.create_recipe()
+        recipe.tags.add(tag)
+
+        res = self.client.patch(tag_url(tag.id), {'name': 'Brunch'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tags_summary,
+                         [{'id': tag.id, 'name': 'Brunch'}])
+
+    def test_rename_after_load_survives_recipe_update(self):
+        """Test a PATCH does not write back a summary loaded earlier."""
+        tag = Tag.objects.create(user=self.user, name='Before')
+        recipe = self.create_recipe()
+        recipe.tags.add(tag)
+        get_object = RecipeViewSet.get_object
+
+        def load_then_rename(view):
+            loaded = get_object(view)
+            # 食譜載入後、儲存前，另一個請求將標籤改名
+            tag.name = 'After'
+            tag.save()
+            return loaded
+
+        with patch.object(RecipeViewSet, 'get_object', load_then_rename):
+            res = self.client.patch(detail_url(recipe.id), {'title': 'New'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'New')
+        self.assertEqual(recipe.tags_summary,
+                         [{'id': tag.id, 'name': 'After'}])
+        self.assertSummariesFresh()
+
+    def test_tag_and_ingredient_delete_updates_recipes(self):
+        """Test deleting a tag or ingredient removes it from summaries."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other = Tag.objects.create(user=self.user, name='Quick')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        recipe = self.create_recipe()
+        recipe.tags.add(tag, other)
+        recipe.ingredients.add(ingredient)
+
+        tag.delete()
+        ingredient.delete()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tags_summary, summary(other))
+        self.assertEqual(recipe.ingredients_summary, [])
+
+    def test_reverse_m2m_changes(self):
+        """Test tag.recipe_set add / clear update every affected recipe."""
+        tag = Tag.objects.create(user=self.user, name='Soup')
+        recipes = [self.create_recipe() for _ in range(2)]
+
+        tag.recipe_set.add(*recipes)
+        self.assertSummariesFresh()
+        self.assertEqual(
+            Recipe.objects.get(id=recipes[1].id).tags_summary, summary(tag))
+
+        tag.recipe_set.clear()
+        self.assertSummariesFresh()
+        self.assertEqual(
+            Recipe.objects.get(id=recipes[0].id).tags_summary, [])
+
+    def test_bulk_create_writes_summaries(self):
+        """Test bulk imports insert summaries with the recipes."""
+        items = [{
+            'title': 'Toast',
+            'time_minutes': 2,
+            'price': Decimal('1.00'),
+            'tags': [{'name': 'Breakfast'}, {'name': 'Breakfast'}],
+            'ingredients': [{'name': 'Bread'}],
+        }]
+
+        recipe, = bulk_create_recipes(self.user, items)
+
+        recipe = Recipe.objects.get(id=recipe.id)
+        self.assertEqual(recipe.tags_summary,
+                         summary(Tag.objects.get(name='Breakfast')))
+        self.assertSummariesFresh()
+
+    def test_rebuild_command(self):
+        """Test the command reports drift and rebuilds summaries."""
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        recipe = self.create_recipe()
+        recipe.tags.add(tag)
+        Recipe.objects.filter(id=recipe.id).update(tags_summary=[])
+
+        with self.assertRaisesMessage(CommandError, str(recipe.id)):
+            call_command('rebuild_recipe_summaries', verify=True)
+
+        out = StringIO()
+        call_command('rebuild_recipe_summaries', batch_size=1, stdout=out)
+        self.assertIn('1 recipe(s)', out.getvalue())
+        call_command('rebuild_recipe_summaries', verify=True, stdout=out)
+        self.assertIn(
+            'All recipe summaries, search vectors and counts match',
+            out.getvalue())
+
+
+class ConcurrentSummaryTests(TransactionTestCase):
+    """Test summaries written by transactions that overlap."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+
+    def in_other_transaction(self, func):
+        """Run func in another thread (its own database connection)."""
+        def run():
+            try:
+                func()
+            finally:
+                connection.close()
+
+        return threading.Thread(target=run)
+
+    def test_rename_during_concurrent_link(self):
+        """Test a link added while a rename is open sees the new name."""
+        tag = Tag.objects.create(user=self.user, name='Old')
+        other = Tag.objects.create(user=self.user, name='Other')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('1.00'))
+        recipe.tags.add(tag)
+
+        thread = self.in_other_transaction(lambda: recipe.tags.add(other))
+        with transaction.atomic():
+            tag.name = 'New'
+            tag.save()
+            thread.start()
+            time.sleep(0.2)  # 讓另一個 transaction 等待這裡鎖定的食譜
+        thread.join()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tags_summary, summary(tag, other))
+        self.assertEqual(list(find_stale_summaries(Recipe.objects.all())), [])
@@ -3,11 +3,17 @@ from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from core.models import Tag, Recipe
 from rest_framework import status
-from django.test import TestCase
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 from recipe import serializers
+import threading
+import time
 from decimal import Decimal
+from unittest.mock import patch
 
-from recipe.serializers import TagSerializer
+from recipe.counts import annotate_recipe_counts
+from recipe.serializers import TagUsageSerializer
+from recipe.views import TagViewSet
 
 tag_url = reverse('recipe:tag-list')
 
@@ -49,9 +55,10 @@ class PrivateTagApiTest(TestCase):
 
         res = self.client.get(tag_url)
 
-        tags = Tag.objects.all().order_by('-name')  # 修正為只過濾自己的tag
-        serializer = serializers.TagSerializer(tags, many=True)
-        self.assertEqual(res.data, serializer.data)
+        tags = annotate_recipe_counts(
+            Tag.objects.all()).order_by('-name')  # 修正為只過濾自己的tag
+        serializer = serializers.TagUsageSerializer(tags, many=True)
+        self.assertEqual(res.data['results'], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_tag_limited_to_user(self):
@@ -64,9 +71,9 @@ class PrivateTagApiTest(TestCase):
 
         res = self.client.get(tag_url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
     def test_update_tag(self):
         """測試更新是否成功"""
@@ -79,6 +86,17 @@ class PrivateTagApiTest(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])  # 修正的 name 檢查
 
+    def test_update_tag_duplicate_name_error(self):
+        """測試改成已存在的名稱會回傳錯誤"""
+        Tag.objects.create(user=self.user, name='Taken')
+        tag = Tag.objects.create(user=self.user, name='before')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Taken'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'before')
+
     def test_delete_tag(self):
         """刪除Tag """
         tag = Tag.objects.create(user=self.user, name="test")  # 修正的 objects
@@ -90,6 +108,14 @@ class PrivateTagApiTest(TestCase):
         tags = Tag.objects.filter(user=self.user)
         self.assertFalse(tags.exists())
 
+    def test_retrieve_tag_detail_not_allowed(self):
+        """測試Tag沒有單筆查詢 (GET detail 回傳 405)"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.get(detail_url(tag.id))
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
     def test_filter_tags_assigned_to_recipes(self):
         """Test listing tags to those assigned to recipes."""
         tag1 = Tag.objects.create(user=self.user, name='Breakfast')
@@ -104,10 +130,11 @@ class PrivateTagApiTest(TestCase):
 
         res = self.client.get(tag_url, {'assigned_only': 1})
 
-        s1 = TagSerializer(tag1)
-        s2 = TagSerializer(tag2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        annotated = annotate_recipe_counts(Tag.objects.all())
+        s1 = TagUsageSerializer(annotated.get(id=tag1.id))
+        s2 = TagUsageSerializer(annotated.get(id=tag2.id))
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_tags_unique(self):
         """Test filtered tags returns a unique list."""
@@ -130,4 +157,120 @@ class PrivateTagApiTest(TestCase):
 
         res = self.client.get(tag_url, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_paginated_by_name(self):
+        """Test tag list pages follow the -name ordering."""
+        for name in ['Apple', 'Banana', 'Cherry']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(tag_url, {'page_size': 2})
+        names = [item['name'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names.extend(item['name'] for item in res.data['results'])
+
+        self.assertEqual(names, ['Cherry', 'Banana', 'Apple'])
+        self.assertIsNone(res.data['next'])
+
+    def _create_recipe(self, *tags):
+        recipe = Recipe.objects.create(
+            title='Soup', time_minutes=5, price=Decimal('1.00'),
+            user=self.user)
+        recipe.tags.add(*tags)
+        return recipe
+
+    def test_list_includes_recipe_counts(self):
+        """Test tag list reports recipe counts in a single query."""
+        soup = Tag.objects.create(user=self.user, name='Soup')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        Tag.objects.create(user=self.user, name='Unused')
+        self._create_recipe(soup, quick)
+        self._create_recipe(soup)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(tag_url)
+
+        counts = {item['name']: item['recipe_count']
+                  for item in res.data['results']}
+        self.assertEqual(counts, {'Soup': 2, 'Quick': 1, 'Unused': 0})
+
+    @override_settings(RECIPE_ATTR_COUNTER_COLUMN=True)
+    def test_counter_column_maintained(self):
+        """Test recipe_count follows link changes and recipe deletes."""
+        soup = Tag.objects.create(user=self.user, name='Soup')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        first = self._create_recipe(soup, quick)
+        second = self._create_recipe(soup)
+
+        first.tags.remove(quick)
+        second.delete()
+        soup.recipe_set.add(self._create_recipe())
+
+        soup.refresh_from_db()
+        quick.refresh_from_db()
+        self.assertEqual((soup.recipe_count, quick.recipe_count), (2, 0))
+
+        res = self.client.get(tag_url, {'assigned_only': 1})
+        self.assertEqual(
+            [(item['name'], item['recipe_count'])
+             for item in res.data['results']],
+            [('Soup', 2)])
+
+        first.tags.clear()
+        soup.refresh_from_db()
+        self.assertEqual(soup.recipe_count, 1)
+
+    @override_settings(RECIPE_ATTR_COUNTER_COLUMN=True)
+    def test_rename_keeps_count_changed_after_load(self):
+        """Test a PATCH does not write back a recipe_count loaded earlier."""
+        tag = Tag.objects.create(user=self.user, name='Soup')
+        get_object = TagViewSet.get_object
+
+        def load_then_link(view):
+            loaded = get_object(view)
+            # 標籤載入後、儲存前，另一個請求將它加到食譜
+            self._create_recipe(tag)
+            return loaded
+
+        with patch.object(TagViewSet, 'get_object', load_then_link):
+            res = self.client.patch(detail_url(tag.id), {'name': 'Stew'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag.refresh_from_db()
+        self.assertEqual((tag.name, tag.recipe_count), ('Stew', 1))
+
+
+@override_settings(RECIPE_ATTR_COUNTER_COLUMN=True)
+class ConcurrentCounterColumnTest(TransactionTestCase):
+    """測試同時寫入關聯時 recipe_count 不會少算"""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def _create_recipe(self):
+        return Recipe.objects.create(
+            title='Soup', time_minutes=5, price=Decimal('1.00'),
+            user=self.user)
+
+    def test_concurrent_links_both_counted(self):
+        """兩個 transaction 同時將不同食譜加到同一個Tag"""
+        tag = Tag.objects.create(user=self.user, name='Soup')
+        first = self._create_recipe()
+        second = self._create_recipe()
+
+        def link_second():
+            try:
+                second.tags.add(tag)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=link_second)
+        with transaction.atomic():
+            first.tags.add(tag)
+            thread.start()
+            time.sleep(0.2)  # 讓另一個 transaction 等待這裡持有的鎖
+        thread.join()
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_set.count(), 2)
+        self.assertEqual(tag.recipe_count, 2)
@@ -0,0 +1,160 @@
+"""
+Tests for streaming image uploads.
+"""
+import hashlib
+import os
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.uploads import (
+    INCOMING_DIR,
+    StreamingImageUploadHandler,
+    sniff_image_format,
+)
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def jpeg_bytes(size=(50, 50)):
+    buffer = BytesIO()
+    Image.new('RGB', size).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def leftover_uploads():
+    _, files = default_storage.listdir(INCOMING_DIR)
+    return [name for name in files if name.startswith('.upload-')]
+
+
+class StreamingUploadHandlerTests(TestCase):
+    """Test the chunked upload handler."""
+
+    def _handler(self):
+        handler = StreamingImageUploadHandler(RequestFactory().post('/'))
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+        return handler
+
+    def test_chunks_written_to_incoming_dir_and_hashed(self):
+        """Test chunks stream into the private incoming dir with a digest."""
+        data = jpeg_bytes((400, 400))
+        handler = self._handler()
+        for start in range(0, len(data), 1024):
+            handler.receive_data_chunk(data[start:start + 1024], start)
+
+        uploaded = handler.file_complete(len(data))
+
+        self.assertEqual(
+            os.path.dirname(uploaded.temporary_file_path()),
+            default_storage.path(INCOMING_DIR))
+        self.assertEqual(uploaded.content_hash,
+                         hashlib.sha256(data).hexdigest())
+        self.assertEqual(uploaded.image_format, 'JPEG')
+        self.assertEqual(uploaded.read(), data)
+        uploaded.close()
+
+    def test_non_image_discarded_after_first_chunk(self):
+        """Test non-image uploads stop being written after the header."""
+        handler = self._handler()
+        handler.receive_data_chunk(b'not an image' * 10, 0)
+        handler.receive_data_chunk(b'x' * 1000, 120)
+
+        uploaded = handler.file_complete(1120)
+
+        self.assertIsNone(uploaded.image_format)
+        self.assertEqual(uploaded.size, 120)
+        uploaded.close()
+
+    def test_sniff_image_format(self):
+        """Test image formats are detected from magic bytes."""
+        self.assertEqual(sniff_image_format(jpeg_bytes()[:16]), 'JPEG')
+        self.assertEqual(
+            sniff_image_format(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'WEBP')
+        self.assertIsNone(sniff_image_format(b'%PDF-1.4'))
+
+
+class StreamingUploadApiTests(TestCase):
+    """Test uploads through the upload-image endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'password123')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Photo', time_minutes=5,
+            price=Decimal('1.00'))
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def test_upload_moves_temp_file_into_place(self):
+        """Test the streamed temp file becomes the stored image."""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            image_file.write(jpeg_bytes())
+            image_file.seek(0)
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': image_file},
+                format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.recipe.image.open('rb') as stored:
+            self.assertEqual(stored.read(), jpeg_bytes())
+        self.assertEqual(leftover_uploads(), [])
+
+    def test_validation_reads_header_only(self):
+        """Test upload validation does not decode the image."""
+        upload = SimpleUploadedFile('photo.jpg', jpeg_bytes(), 'image/jpeg')
+
+        with patch('PIL.ImageFile.ImageFile.load') as mock_load, \
+                patch('PIL.Image.Image.verify') as mock_verify:
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': upload},
+                format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        mock_load.assert_not_called()
+        mock_verify.assert_not_called()
+
+    def test_non_image_rejected(self):
+        """Test files without an image header are rejected."""
+        upload = SimpleUploadedFile(
+            'photo.jpg', b'<html></html>' * 100, 'image/jpeg')
+
+        res = self.client.post(
+            image_upload_url(self.recipe.id), {'image': upload},
+            format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(leftover_uploads(), [])
+
+    def test_oversized_dimensions_rejected(self):
+        """Test images whose header declares too many pixels are rejected."""
+        upload = SimpleUploadedFile(
+            'photo.jpg', jpeg_bytes((100, 100)), 'image/jpeg')
+
+        with patch('PIL.Image.MAX_IMAGE_PIXELS', 5000):
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': upload},
+                format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,146 @@
+"""
+食譜圖片上傳
+- StreamingImageUploadHandler：multipart 的每個 chunk (64KB) 直接寫進圖片儲存
+  位置 (MEDIA_ROOT) 下不對外提供的暫存目錄，同時計算 sha256 並在第一個 chunk
+  檢查檔頭 (magic bytes)；與最終位置在同一個檔案系統，儲存時 FileSystemStorage
+  只需 rename，不會在記憶體與暫存目錄間重複複製
+- HeaderOnlyImageField：只解析圖片檔頭 (格式、尺寸)，不解碼整張圖片
+"""
+import hashlib
+import os
+import tempfile
+
+from django import forms
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile, UploadedFile
+)
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+
+from core.storage import get_image_storage
+
+# 上傳中 / 被拒絕的暫存檔；不可放在 uploads/ 底下 (nginx 直接對外提供並長期快取)，
+# 以 . 開頭的路徑由 nginx 拒絕 (proxy/default.conf.tpl)
+INCOMING_DIR = '.incoming'
+
+# 檔頭 -> 格式；WebP 為 RIFF????WEBP，另外檢查
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'JPEG',
+    b'\x89PNG\r\n\x1a\n': 'PNG',
+    b'GIF87a': 'GIF',
+    b'GIF89a': 'GIF',
+}
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+
+
+def sniff_image_format(header):
+    """由檔案開頭的位元組判斷圖片格式，不是支援的格式回傳 None"""
+    for signature, image_format in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def _incoming_dir():
+    """上傳暫存目錄 (非本機檔案系統的 storage 改用系統暫存目錄)"""
+    try:
+        path = get_image_storage().path(INCOMING_DIR)
+    except NotImplementedError:
+        return None
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class StreamedImageFile(TemporaryUploadedFile):
+    """
+    暫存在 INCOMING_DIR 的上傳檔，與目標位置在同一個檔案系統，
+    儲存時以 rename 取代複製
+    content_hash: 內容的 sha256；image_format: 由檔頭判斷的格式
+    """
+
+    def __init__(self, name, content_type, size, charset,
+                 content_type_extra=None):
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(
+            prefix='.upload-', suffix=ext, dir=_incoming_dir())
+        UploadedFile.__init__(
+            self, file, name, content_type, size, charset,
+            content_type_extra)
+        self.content_hash = None
+        self.image_format = None
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """
+    只用於圖片上傳的 upload handler (在 view 中設定 request.upload_handlers)
+    檔頭不是支援的圖片格式時只保留第一個 chunk，其餘資料直接丟棄，
+    交由 HeaderOnlyImageField 回傳驗證錯誤
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = StreamedImageFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+        self.rejected = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rejected:
+            return None
+        if start == 0:
+            self.file.image_format = sniff_image_format(raw_data[:16])
+            self.rejected = self.file.image_format is None
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        self.received += len(raw_data)
+        return None  # 不再交給後面的 handler，記憶體只保留一個 chunk
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = self.received  # 被拒絕的檔案只寫入第一個 chunk
+        self.file.content_hash = self.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()  # NamedTemporaryFile 關閉時自動刪除
+
+
+class HeaderOnlyImageField(forms.ImageField):
+    """
+    取代 Django 的 ImageField 驗證 (完整讀取並 verify 整個檔案)：
+    Pillow 的 Image.open 只解析檔頭，確認格式與尺寸 (防止解壓縮炸彈) 即可，
+    實際解碼留給背景 worker (recipe/tasks.py)
+    """
+
+    def to_python(self, data):
+        f = forms.FileField.to_python(self, data)
+        if f is None:
+            return None
+
+        if hasattr(data, 'temporary_file_path'):
+            source = data.temporary_file_path()
+        else:
+            source = data
+        try:
+            with Image.open(source) as image:
+                image_format = image.format
+                width, height = image.size
+            if image_format not in ALLOWED_FORMATS:
+                raise ValueError(f'Unsupported format {image_format}')
+            if width * height > Image.MAX_IMAGE_PIXELS:
+                raise ValueError('Image too large')
+        except Exception as exc:
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'],
+                code='invalid_image',
+            ) from exc
+
+        f.content_type = Image.MIME.get(image_format)
+        if hasattr(f, 'seek') and callable(f.seek):
+            f.seek(0)
+        return f
@@ -1,23 +1,47 @@
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication  # 用於 Token 驗證
 from rest_framework.permissions import IsAuthenticated  # 用於權限控制，確保只有已驗證用戶可訪問
 from rest_framework.decorators import action  # 用於自定義 ViewSet 中的非標準行為（例如上傳圖片）
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from django.http import StreamingHttpResponse
 from core.models import Recipe, Tag, Ingredient
+from core.parsers import FastJSONParser
 from . import serializers
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .pagination import (
+    RecipeCursorPagination, RecipeAttrCursorPagination, RecipeSearchPagination
+)
+from .queries import (
+    MATCH_ANY, MATCH_MODES, filter_by_related, plan_recipe_queryset
+)
+from .parsers import NDJSONParser
+from .renderers import NDJSONRenderer
+from .bulk import bulk_create_recipes, iter_recipes_ndjson
+from .search import search_recipes
+from .summaries import SUMMARY_FIELDS
+from .autocomplete import autocomplete
+from .counts import annotate_recipe_counts, filter_assigned
+from .cache import CachedListMixin, CachedResponseMixin
+from .fastpath import FastListMixin
+from .uploads import StreamingImageUploadHandler
+from user.authentication import (  # 快取版 Token 驗證 / 無狀態 JWT 驗證
+    CachedTokenAuthentication, StatelessJWTAuthentication)
 
 # 用於處理標籤或食材相關的基本操作，繼承了列表、更新、刪除等操作
 
 
-class BaseAttrRecipeViewSet(mixins.UpdateModelMixin,
+class BaseAttrRecipeViewSet(CachedListMixin,
+                            mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet,
                             mixins.DestroyModelMixin):
     """重構 Class 讓 TagViewSet 跟 IngredientViewSet 繼承"""
 
-    authentication_classes = [TokenAuthentication, ]  # 設定 Token 認證方式
+    authentication_classes = [CachedTokenAuthentication, ]  # 設定 Token 認證方式
     permission_classes = [IsAuthenticated, ]  # 設定權限，僅認證用戶可訪問
+    pagination_class = RecipeAttrCursorPagination  # 游標分頁
+    autocomplete_limit = 10  # 自動完成預設回傳筆數
+    autocomplete_max_limit = 50
 
     def get_queryset(self):
         """
@@ -26,23 +50,46 @@ class BaseAttrRecipeViewSet(mixins.UpdateModelMixin,
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
-        queryset = self.queryset
+        # recipe_count 欄位由 signal 維護，不載入；更新名稱時 save() 就不會
+        # 寫回載入後才變更的計數 (輸出讀 annotate 的 num_recipes)
+        queryset = annotate_recipe_counts(self.queryset.defer('recipe_count'))
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = filter_assigned(queryset)  # EXISTS，不會產生重複資料
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()  # 根據名稱排序並去重
+        ).order_by('-name')  # 根據名稱排序
+
+    @action(methods=['GET'], detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        """
+        名稱自動完成 ?q=<輸入文字>&limit=<筆數>
+        開頭相符優先，其次為拼字相近 (pg_trgm)，不分頁
+        """
+        try:
+            limit = int(request.query_params.get(
+                'limit', self.autocomplete_limit))
+        except ValueError:
+            limit = self.autocomplete_limit
+        limit = max(1, min(limit, self.autocomplete_max_limit))
+        return Response(autocomplete(
+            self.queryset.model, request.user.pk,
+            request.query_params.get('q', ''), limit))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedResponseMixin, FastListMixin,
+                    viewsets.ModelViewSet):
     """處理食譜相關的 CRUD 操作"""
     serializer_class = serializers.RecipeDetailSerializer  # 默認使用詳細的序列化器
-    queryset = Recipe.objects.all()  # 查詢所有食譜
+    queryset = Recipe.objects.defer('search_vector')  # 搜尋欄位不需載入
     authentication_classes = [
-        TokenAuthentication,
-        JWTAuthentication]  # Token 認證
+        CachedTokenAuthentication,
+        StatelessJWTAuthentication]  # Token / JWT 認證
     permission_classes = [IsAuthenticated]  # 僅認證用戶可訪問
+    pagination_class = RecipeCursorPagination  # 游標分頁
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [
+        NDJSONRenderer]  # ?format=ndjson 串流輸出
+    bulk_max_items = 5000  # 單次批次匯入的上限
 
     def _params_to_ints(self, qs):
         """將逗號分隔的字符串轉換為整數列表，方便過濾條件使用
@@ -51,23 +98,73 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _match_mode(self):
+        """
+        ?match=any (預設，有任一個標籤 / 食材) 或 all (全部都有)
+        tags 與 ingredients 同時指定時兩者都要符合
+        """
+        match = self.request.query_params.get('match', MATCH_ANY)
+        if match not in MATCH_MODES:
+            raise ValidationError(
+                {'match': f'Must be one of: {", ".join(MATCH_MODES)}.'})
+        return match
+
     def get_queryset(self):
         """根據當前用戶以及查詢參數過濾並檢索食譜"""
         tags = self.request.query_params.get('tags')  # 獲取查詢參數中的標籤
         ingredients = self.request.query_params.get(
             'ingredients')  # 獲取查詢參數中的食材
+        match = self._match_mode()
         queryset = self.queryset
         if tags:
             tag_ids = self._params_to_ints(tags)  # 轉換標籤 ID 列表
-            queryset = queryset.filter(tags__id__in=tag_ids)  # 根據標籤過濾
+            queryset = filter_by_related(
+                queryset, 'tags', tag_ids, match)  # 根據標籤過濾
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)  # 轉換食材 ID 列表
-            queryset = queryset.filter(
-                ingredients__id__in=ingredient_ids)  # 根據食材過濾
+            queryset = filter_by_related(
+                queryset, 'ingredients', ingredient_ids, match)  # 根據食材過濾
 
-        return queryset.filter(
+        # 過濾條件為子查詢，不會有重複的食譜，不需要 DISTINCT
+        queryset = queryset.filter(
             user=self.request.user  # 只返回當前用戶的食譜
-        ).order_by('-id').distinct()  # 根據 ID 排序並去重
+        ).order_by('-id')  # 根據 ID 排序
+
+        search = self._search_text()
+        if search:
+            queryset = search_recipes(queryset, search)  # 依相關程度排序
+
+        if self.action in ('list', 'retrieve', 'export'):
+            # 唯讀操作依序列化器 (含 ?fields= / ?exclude=) 實際輸出的欄位規劃查詢
+            queryset = plan_recipe_queryset(queryset, self.get_serializer())
+        else:
+            # summary 欄位由 signal 維護；寫入操作不載入，save() 就不會
+            # 寫回載入後才被標籤 / 食材改名更新的內容
+            queryset = queryset.defer(*SUMMARY_FIELDS.values())
+        return queryset
+
+    def _search_text(self):
+        """?q= 全文搜尋字串 (只用於列表)"""
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('q', '').strip()
+
+    @property
+    def paginator(self):
+        """搜尋結果依相關程度排序，改用頁碼分頁"""
+        if not hasattr(self, '_paginator') and self._search_text():
+            self._paginator = RecipeSearchPagination()
+        return super().paginator
+
+    def get_serializer(self, *args, **kwargs):
+        """唯讀操作支援 ?fields=id,title / ?exclude=description 欄位投影"""
+        if self.action in ('list', 'retrieve', 'export'):
+            for param in ('fields', 'exclude'):
+                value = self.request.query_params.get(param, '')
+                names = [name.strip() for name in value.split(',')]
+                if any(names):
+                    kwargs[param] = [name for name in names if name]
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -77,6 +174,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        """?format=ndjson 時不分頁，以串流逐筆輸出全部食譜"""
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return self._stream_ndjson()
+        return super().list(request, *args, **kwargs)
+
+    def _stream_ndjson(self):
+        """以 server-side cursor 分段讀取並逐筆序列化，記憶體用量不隨食譜數量成長"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            iter_recipes_ndjson(queryset, self.get_serializer()),
+            content_type=NDJSONRenderer.media_type,
+        )
+
     def perform_create(self, serializer):
         """自動將當前用戶設置為創建食譜的擁有者"""
         serializer.save(user=self.request.user)
@@ -84,11 +195,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """上傳圖片功能的自定義 action"""
+        # 上傳內容以 chunk 直接寫入儲存目錄並計算雜湊 (須在讀取 request.data 前設定)
+        request.upload_handlers = [StreamingImageUploadHandler(request)]
         recipe = self.get_object()  # 獲取當前操作的食譜對象
         serializer = self.get_serializer(recipe, data=request.data)  # 使用圖片序列化器
 
         if serializer.is_valid():
-            serializer.save()  # 保存圖片
+            serializer.save()  # 保存原圖，縮圖由背景 worker 產生
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK)  # 返回成功響應
@@ -97,13 +210,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST)  # 返回錯誤響應
 
+    @action(methods=['POST'], detail=False, url_path='bulk',
+            parser_classes=[FastJSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        批次匯入食譜 (JSON array 或 NDJSON)
+        整批驗證，任一筆失敗則全部不寫入，並回傳每一筆的錯誤
+        """
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=self.bulk_max_items)
+
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):  # 逐筆錯誤，只回傳有錯的項目
+                errors = [
+                    {'index': index, 'errors': item_errors}
+                    for index, item_errors in enumerate(errors)
+                    if item_errors
+                ]
+            return Response(
+                {'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        recipes = bulk_create_recipes(
+            request.user, serializer.validated_data)
+        return Response(
+            {'created': len(recipes), 'ids': [r.id for r in recipes]},
+            status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """以 NDJSON 串流匯出食譜 (格式與批次匯入相同)，支援 tags / ingredients 過濾"""
+        response = self._stream_ndjson()
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"')
+        return response
+
 
 class TagViewSet(BaseAttrRecipeViewSet):
     """處理標籤的 CRUD 操作，繼承了 BaseAttrRecipeViewSet 的基礎邏輯"""
-    serializer_class = serializers.TagSerializer  # 使用標籤序列化器
+    serializer_class = serializers.TagUsageSerializer  # 含使用中的食譜數
     queryset = Tag.objects.all()  # 查詢所有標籤
 
 
 class IngredientViewSet(BaseAttrRecipeViewSet):
-    serializer_class = serializers.IngredientSerializer  # 使用食材序列化器
+    serializer_class = serializers.IngredientUsageSerializer  # 含食譜數
     queryset = Ingredient.objects.all()  # 查詢所有食材
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from . import signals  # noqa: F401 註冊 Token 驗證快取失效的 signal
+        from . import schema  # noqa: F401 註冊 OpenAPI 的 JWT 驗證說明
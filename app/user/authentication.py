@@ -0,0 +1,112 @@
+"""
+快取版 Token 驗證
+TokenAuthentication 每個請求都要查 authtoken_token 並 join 使用者資料表；
+這裡把驗證需要的欄位 (使用者 id、is_active、token 建立時間) 放進快取
+(settings.TOKEN_AUTH_CACHE_ALIAS，須為所有 worker 共用的後端)，
+短 TTL 內的請求不需要查資料庫
+- token 被刪除、使用者被停用 / 修改時由 signals.py 清除快取
+- 快取 key 使用 token 的雜湊，不把 token 明文存進快取；
+  也不快取使用者物件 (密碼雜湊等欄位)，view 讀取其他欄位時才由資料庫載入
+
+無狀態 JWT 驗證
+JWTAuthentication 驗證簽章後還會查一次使用者資料表；StatelessJWTAuthentication
+只檢查簽章、claims 與撤銷清單 (revocation.py)，使用者物件直接由 claims 建立
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import revocation
+
+KEY_PREFIX = 'auth-token'
+
+
+def get_cache():
+    return caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+
+
+def token_cache_key(key):
+    return f'{KEY_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def evict_token(key):
+    """清除某個 token 的快取 (token 刪除或使用者資料變更時呼叫)"""
+    get_cache().delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    可直接取代 TokenAuthentication 放進 authentication_classes
+    快取命中時不查資料庫；未命中時照原本流程查詢後寫入快取
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        cache = get_cache()
+        cache_key = token_cache_key(key)
+        values = cache.get(cache_key)
+        if values is None:
+            values = model.objects.filter(key=key).values(
+                'user_id', 'created', 'user__is_active').first()
+            if values is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cache.set(cache_key, values, settings.TOKEN_AUTH_CACHE_TIMEOUT)
+
+        if not values['user__is_active']:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        # 使用者只帶主鍵：其他欄位在讀取時才從資料庫載入，不會拿到過期的資料，
+        # save() 時也只寫回 view 修改過的欄位
+        user = _deferred_user(
+            get_user_model()._meta.pk.attname, values['user_id'])
+        token = model.from_db(
+            DEFAULT_DB_ALIAS, ['key', 'user_id', 'created'],
+            [key, values['user_id'], values['created']])
+        token.user = user
+        return (user, token)
+
+
+def _deferred_user(field, value):
+    return get_user_model().from_db(DEFAULT_DB_ALIAS, [field], [value])
+
+
+def user_from_claims(user_id):
+    """
+    只帶主鍵的使用者物件，其餘欄位皆為 deferred：
+    當作外鍵 (filter / save(user=...)) 使用時不查資料庫，
+    讀取其他欄位 (例如 email) 時才由 Django 自動載入
+    """
+    return _deferred_user(jwt_settings.USER_ID_FIELD, user_id)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    可直接取代 JWTAuthentication 放進 authentication_classes
+    驗證過程不存取資料庫；登出的 token 與停用的帳號由撤銷清單擋下
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+
+        if revocation.is_revoked(
+                validated_token.get(jwt_settings.JTI_CLAIM),
+                user_id,
+                validated_token.get('iat', 0)):
+            raise exceptions.AuthenticationFailed(
+                _('Token has been revoked.'), code='token_revoked')
+
+        return user_from_claims(user_id)
@@ -0,0 +1,90 @@
+"""
+JWT 撤銷清單
+- 撤銷的 access token (jti) 與被撤銷的使用者 (該時間點以前簽發的 token 都失效)
+  存在資料庫 (core.models.JWTRevocation)，每次撤銷一列：不同 worker 同時寫入
+  不會互相覆蓋，也不會因快取淘汰而遺失
+- 每個 process 保留一份本地副本，每 JWT_REVOCATION_REFRESH_SECONDS 秒才重新
+  讀取尚未過期的紀錄，驗證 token 時只查本地的 dict；
+  撤銷的 process 立即生效，其他 worker 最多延遲一個更新週期
+- 紀錄在 token 本身過期後就沒有意義，寫入時順便刪除
+"""
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from core.models import JWTRevocation
+
+_local = {'loaded_at': None, 'jtis': set(), 'users': {}}
+
+
+def _max_token_age():
+    """access token 的最長有效時間 (秒)，撤銷紀錄保留這麼久即可"""
+    lifetime = settings.SIMPLE_JWT.get('ACCESS_TOKEN_LIFETIME')
+    return int(lifetime.total_seconds()) if lifetime else 300
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def _apply(jti, user_id, revoked_at):
+    """把一筆撤銷紀錄加入本地副本"""
+    if jti:
+        _local['jtis'].add(jti)
+    else:
+        _local['users'][user_id] = max(
+            _local['users'].get(user_id, revoked_at), revoked_at)
+
+
+def _store(jti, user_id, revoked_at, expires_at):
+    """新增一筆撤銷紀錄 (順便刪除已過期的紀錄)，並同步本地副本"""
+    JWTRevocation.objects.filter(
+        expires_at__lte=_datetime(revoked_at)).delete()
+    # 同一個 token 重複登出時 jti 已存在，忽略即可
+    JWTRevocation.objects.bulk_create([JWTRevocation(
+        jti=jti,
+        user_id=user_id,
+        revoked_at=_datetime(revoked_at),
+        expires_at=_datetime(expires_at),
+    )], ignore_conflicts=True)
+    _apply(jti, user_id, revoked_at)
+
+
+def _state():
+    now = time.time()
+    loaded_at = _local['loaded_at']
+    if (loaded_at is None or
+            now - loaded_at >= settings.JWT_REVOCATION_REFRESH_SECONDS):
+        rows = JWTRevocation.objects.filter(
+            expires_at__gt=_datetime(now)).values_list(
+            'jti', 'user_id', 'revoked_at')
+        _local.update(loaded_at=now, jtis=set(), users={})
+        for jti, user_id, revoked_at in rows:
+            _apply(jti, user_id, revoked_at.timestamp())
+    return _local
+
+
+def revoke_token(jti, user_id, exp):
+    """撤銷單一 token (登出時)；exp 為 token 的過期時間 (unix timestamp)"""
+    _store(jti, user_id, time.time(), exp)
+
+
+def revoke_user(user_id):
+    """撤銷使用者目前所有的 token (停用或刪除帳號時)"""
+    now = time.time()
+    _store(None, user_id, now, now + _max_token_age())
+
+
+def is_revoked(jti, user_id, issued_at):
+    """token 是否已被撤銷 (只查本地副本，每個更新週期才查一次資料庫)"""
+    state = _state()
+    if jti in state['jtis']:
+        return True
+    revoked_at = state['users'].get(user_id)
+    return revoked_at is not None and issued_at <= revoked_at
+
+
+def reset():
+    """清除本地副本 (測試用)，下次檢查會重新讀取資料庫"""
+    _local.update(loaded_at=None, jtis=set(), users={})
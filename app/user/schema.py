@@ -0,0 +1,10 @@
+"""
+OpenAPI (drf-spectacular) 擴充
+StatelessJWTAuthentication 與 JWTAuthentication 使用相同的 Bearer JWT，
+沿用 simplejwt 的 security scheme (jwtAuth)
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    target_class = 'user.authentication.StatelessJWTAuthentication'
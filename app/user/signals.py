@@ -0,0 +1,51 @@
+"""
+使用者 / Token 的 signal 處理
+token 被刪除或使用者資料變更 (停用、改名、改密碼) 時清除 Token 驗證快取，
+下一個請求會重新從資料庫載入；帳號被停用 (is_active 由 True 變為 False)
+或刪除時同時撤銷其所有 JWT
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import revocation
+from .authentication import evict_token
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """token 被刪除 (含使用者被刪除時的 cascade) 後清除快取"""
+    evict_token(instance.key)
+
+
+@receiver(pre_save, sender=get_user_model())
+def detect_deactivation(sender, instance, update_fields=None, **kwargs):
+    """
+    儲存前比對資料庫中的 is_active，只有這次儲存將帳號停用時才標記；
+    已停用的帳號再次儲存 (管理者編輯、更新 last_login) 不會重複撤銷
+    """
+    instance._deactivated = (
+        instance.pk is not None
+        and not instance.is_active
+        and (update_fields is None or 'is_active' in update_fields)
+        and sender.objects.filter(pk=instance.pk, is_active=True).exists()
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def evict_user_tokens(sender, instance, created, **kwargs):
+    """使用者資料變更後清除其 token 的快取，避免快取中的使用者資料過期"""
+    if created:
+        return
+    if instance.__dict__.pop('_deactivated', False):
+        revocation.revoke_user(instance.pk)
+    for key in Token.objects.filter(
+            user_id=instance.pk).values_list('key', flat=True):
+        evict_token(key)
+
+
+@receiver(post_delete, sender=get_user_model())
+def revoke_deleted_user(sender, instance, **kwargs):
+    """使用者被刪除後撤銷其所有 JWT"""
+    revocation.revoke_user(instance.pk)
@@ -0,0 +1,249 @@
+"""
+Tests for the cached token authentication.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from drf_spectacular.generators import SchemaGenerator
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import JWTRevocation, Recipe
+from user import revocation
+from user.authentication import (
+    CachedTokenAuthentication,
+    get_cache,
+    token_cache_key,
+)
+
+ME_URL = reverse('user:me')
+LOGOUT_URL = reverse('user:logout')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached and evicted."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123', name='Before')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_database(self):
+        """Test a cached token authenticates without queries."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            user, token = CachedTokenAuthentication().authenticate_credentials(
+                self.token.key)
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token.user_id, self.user.pk)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_me_uses_one_query(self):
+        """Test /me loads the profile in one query on cached requests."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data, {
+            'email': self.user.email, 'name': self.user.name})
+
+    def test_password_hash_not_cached(self):
+        """Test the cache holds only what authentication needs."""
+        self.client.get(ME_URL)
+
+        cached = get_cache().get(token_cache_key(self.token.key))
+
+        self.assertEqual(
+            set(cached), {'user_id', 'created', 'user__is_active'})
+
+    def test_update_does_not_write_back_stale_fields(self):
+        """Test a profile update keeps changes made by another worker."""
+        self.client.get(ME_URL)
+        # 其他 worker 的修改 (本 process 的快取不知道)
+        get_user_model().objects.filter(pk=self.user.pk).update(name='Other')
+
+        res = self.client.patch(ME_URL, {'password': 'newpass123'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Other')
+        self.assertTrue(self.user.check_password('newpass123'))
+
+    def test_invalid_token_rejected(self):
+        """Test unknown tokens are still rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_evicted(self):
+        """Test deleting a token revokes it immediately."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_evicted(self):
+        """Test deactivating a user revokes cached authentication."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_refreshes_cached_user(self):
+        """Test the cached user reflects profile updates."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'After'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'After')
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    """Test JWT authentication without database lookups."""
+
+    def setUp(self):
+        get_cache().clear()
+        revocation.reset()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123')
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def test_authentication_does_not_query(self):
+        """Test a valid JWT authenticates without fetching the user."""
+        view_queries = 1  # recipe page (tags / ingredients from summaries)
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='1.00')
+        # 撤銷清單的本地副本已載入 (每個更新週期才查一次資料庫)
+        revocation.is_revoked(None, self.user.pk, 0)
+
+        with self.assertNumQueries(view_queries):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_create_with_claims_user(self):
+        """Test writes are attributed to the user from the token."""
+        payload = {'title': 'Salad', 'time_minutes': 5, 'price': '2.00'}
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.user, self.user)
+
+    def test_logout_revokes_access_token(self):
+        """Test the access token stops working after logout."""
+        res = self.client.post(
+            LOGOUT_URL, {'refresh_token': str(self.refresh)})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_revoked(self):
+        """Test tokens of a deactivated user are rejected."""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_saving_inactive_user_does_not_revoke_again(self):
+        """Test only the save that deactivates a user adds a revocation."""
+        self.user.is_active = False
+        self.user.save()
+        count = JWTRevocation.objects.count()
+
+        self.user.name = 'Renamed'
+        self.user.save()
+        self.user.save(update_fields=['last_login'])
+
+        self.assertEqual(JWTRevocation.objects.count(), count)
+
+    def test_revocations_shared_between_processes(self):
+        """Test a revocation written by another process is picked up."""
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code, status.HTTP_200_OK)
+        # 其他 worker 寫入的紀錄：本 process 的本地副本不知道
+        now = timezone.now()
+        JWTRevocation.objects.create(
+            user_id=self.user.pk, revoked_at=now,
+            expires_at=now + timedelta(hours=1))
+
+        with override_settings(JWT_REVOCATION_REFRESH_SECONDS=0):
+            res = self.client.get(RECIPES_URL, {'page_size': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocations_do_not_overwrite_each_other(self):
+        """Test every revocation is kept and survives a cache flush."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123')
+        access = self.refresh.access_token
+        other_access = RefreshToken.for_user(other).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.client.post(LOGOUT_URL, {'refresh_token': str(self.refresh)})
+        other.is_active = False
+        other.save()
+
+        get_cache().clear()
+        revocation.reset()
+
+        for access in (access, other_access):
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_revocations_pruned(self):
+        """Test revocations outlived by their tokens are deleted."""
+        past = timezone.now() - timedelta(hours=2)
+        JWTRevocation.objects.create(
+            jti='old', user_id=self.user.pk, revoked_at=past,
+            expires_at=past)
+
+        revocation.revoke_user(self.user.pk)
+
+        self.assertFalse(JWTRevocation.objects.filter(jti='old').exists())
+
+
+class JWTSchemaTests(SimpleTestCase):
+    """Test JWT bearer auth appears in the OpenAPI schema."""
+
+    def test_stateless_jwt_documented(self):
+        """Test recipe operations list the jwtAuth security scheme."""
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+
+        self.assertEqual(
+            schema['components']['securitySchemes']['jwtAuth']['scheme'],
+            'bearer')
+        operation = schema['paths']['/api/recipe/']['get']
+        self.assertIn({'jwtAuth': []}, operation['security'])
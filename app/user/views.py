@@ -1,8 +1,12 @@
 """ View for the user API."""
+from django.contrib.auth import get_user_model
 from rest_framework import (
-    generics, authentication, permissions, status, response
+    generics, permissions, status, response
 )
 from .serializers import UserSerializer, AuthTokenSerializer, LoginSerializer
+from .authentication import (
+    CachedTokenAuthentication, StatelessJWTAuthentication)
+from . import revocation
 
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
@@ -29,6 +33,7 @@ class LoginView(APIView):
 
 
 class LogoutView(APIView):
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -37,6 +42,9 @@ class LogoutView(APIView):
 
             token = RefreshToken(refresh_token)
             token.blacklist()
+            # 目前使用的 access token 也立即失效 (無狀態驗證靠撤銷清單擋下)
+            revocation.revoke_token(
+                request.auth['jti'], request.user.pk, request.auth['exp'])
 
             return response.Response({
                 "detail": "Successfully logged out."
@@ -58,9 +66,11 @@ class CreateTokenView(ObtainAuthToken):
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """"視圖會基於模型對象的 id 來獲取對應的對象."""
-        return self.request.user
+        # 快取驗證的 request.user 只載入 pk，一次查詢取得完整資料，
+        # 避免序列化時逐一延遲載入欄位
+        return get_user_model().objects.get(pk=self.request.user.pk)
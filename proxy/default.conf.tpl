@@ -1,13 +1,48 @@
 server {
     listen ${LISTEN_PORT};
 
+    # 靜態檔案 (admin / DRF 的 CSS、JS) 由 nginx 壓縮；圖片本身已壓縮，不在清單內
+    gzip                on;
+    gzip_types          text/css application/javascript text/javascript
+                        application/json image/svg+xml text/plain;
+    gzip_min_length     1024;
+    gzip_comp_level     6;
+    gzip_vary           on;
+
+    # 快取靜態檔案的 file descriptor 與 stat 結果 (含 .gz 是否存在)
+    open_file_cache             max=2000 inactive=60s;
+    open_file_cache_valid       60s;
+    open_file_cache_min_uses    2;
+    open_file_cache_errors      on;
+
     location /static {
         alias /vol/static;
     }
 
+    # 隱藏檔 / 目錄不對外提供 (例如上傳中的暫存檔 media/.incoming/)
+    location ~ "^/static(/.*)?/\." {
+        deny all;
+    }
+
+    # collectstatic 產生的檔名含內容雜湊 (core/storage.py)，同一網址的內容永遠不變；
+    # 旁邊預先壓縮好的 .gz 直接送出 (映像檔沒有 ngx_brotli，不產生 .br)
+    location ~ "^/static/static/(?<asset>.+\.[0-9a-f]{12}\.[A-Za-z0-9]+)$" {
+        alias /vol/static/static/$asset;
+        gzip_static on;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
+    # 上傳的圖片以內容雜湊命名，同一網址的內容永遠不變
+    location /static/media/uploads/ {
+        alias /vol/static/media/uploads/;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
     location / {
         uwsgi_pass              ${APP_HOST}:${APP_PORT};
         include                 /etc/nginx/uwsgi_params;
         client_max_body_size    10M;
+        # API 回應由 app 依 Accept-Encoding 壓縮 (br / gzip，core/middleware.py)
+        gzip                    off;
     }
 }
\ No newline at end of file
@@ -2,5 +2,7 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+# 只替換這幾個變數，設定檔內 nginx 自己的變數 ($asset 等) 保持原樣
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT}' \
+    < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
 nginx -g 'daemon off;'
\ No newline at end of file
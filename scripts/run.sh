@@ -6,4 +6,5 @@ python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi \
+    --attach-daemon "python manage.py process_images"